@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from typing import Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import ReturningInsert
+
+from .config import get_settings
+from .database import AsyncSessionLocal, get_async_engine
+from .http_cache import make_etag
+from .models import AboutSection, ContentVersion
+from .schemas import AboutSectionResponse
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ABOUT_SECTIONS = "about_sections"
+_sections_adapter = TypeAdapter(list[AboutSectionResponse])
+
+
+def bump_version_statement(name: str) -> ReturningInsert[tuple[int]]:
+    """Increment a content version; run it in the same transaction as the write."""
+    statement = pg_insert(ContentVersion).values(name=name, version=1)
+    return statement.on_conflict_do_update(
+        index_elements=[ContentVersion.name],
+        # Bumps of one name queue on its row lock, so clock_timestamp() grows
+        # with the version; greatest() also holds it against a clock stepping back.
+        set_={
+            "version": ContentVersion.version + 1,
+            "updated_at": func.greatest(ContentVersion.updated_at, func.clock_timestamp()),
+        },
+    ).returning(ContentVersion.version)
+
+
+async def bump_version(db: AsyncSession, name: str) -> int:
+    return (await db.execute(bump_version_statement(name))).scalar_one()
+
+
+def _version_query(name: str):
+    return select(ContentVersion.version).where(ContentVersion.name == name)
+
+
+def _version_row_query(name: str):
+    return select(ContentVersion.version, ContentVersion.updated_at).where(ContentVersion.name == name)
+
+
+@dataclass(frozen=True, slots=True)
+class AboutSnapshot:
+    version: int
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+class AboutSectionsSnapshot:
+    """The about sections as pre-serialized JSON, shared by every request in the process.
+
+    Each write bumps the ``about_sections`` row of ``content_versions``. The
+    writing process reloads right after committing, and the others compare
+    versions in the background every ``ABOUT_SNAPSHOT_POLL_SECONDS``, so
+    requests are served from memory.
+    """
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[AboutSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def get(self) -> AboutSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = await self.reload()
+        return snapshot
+
+    async def reload(self) -> AboutSnapshot:
+        async with self._lock:
+            async with AsyncSessionLocal(bind=get_async_engine()) as session:
+                # Version first: rows read afterwards are at least that new, and a
+                # write slipping in between only causes one extra reload later.
+                row = (await session.execute(_version_row_query(ABOUT_SECTIONS))).one_or_none()
+                version, bumped_at = row if row is not None else (0, None)
+                if self._snapshot is not None and self._snapshot.version == version:
+                    return self._snapshot
+                sections = (await session.scalars(select(AboutSection).order_by(AboutSection.id.asc()))).all()
+            body = _sections_adapter.dump_json(_sections_adapter.validate_python(sections, from_attributes=True))
+            self._snapshot = AboutSnapshot(
+                version=version,
+                body=body,
+                etag=make_etag(ABOUT_SECTIONS, body),
+                # The bump time, not the newest row: deleting a section must move it forward too.
+                last_modified=bumped_at,
+            )
+            return self._snapshot
+
+    def start(self) -> None:
+        if self._task is None and settings.about_snapshot_poll_seconds > 0:
+            self._task = asyncio.create_task(self._poll(), name="about-snapshot")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(settings.about_snapshot_poll_seconds)
+            try:
+                async with AsyncSessionLocal(bind=get_async_engine()) as session:
+                    row = (await session.execute(_version_row_query(ABOUT_SECTIONS))).one_or_none()
+                version, bumped_at = row if row is not None else (0, None)
+                if self._snapshot is None or self._snapshot.version != version:
+                    await self.reload()
+            except Exception:  # pragma: no cover - keep serving the last snapshot
+                logger.exception("About sections version check failed")
+
+
+about_snapshot = AboutSectionsSnapshot()
@@ -6,18 +6,33 @@ from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .cache import TTLCache
 from .config import get_settings
 from .database import get_db
+from .hashing import pwd_context
 from .models import User, UserRole
 from .schemas import TokenPayload
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 settings = get_settings()
 
+USER_CHANNEL = "ituhouse_users"
+
+# Active users by id; entries are detached from their session and must be treated as read-only.
+# Role and active-state changes reach every process through publish_user_changed.
+user_cache: TTLCache[User] = TTLCache(
+    ttl_seconds=settings.user_cache_ttl_seconds,
+    max_size=settings.user_cache_max_size,
+)
+
+
+def normalize_email(email: str) -> str:
+    """Emails are stored in this form so lookups can use the plain column indexes."""
+    return email.strip().lower()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -35,10 +50,15 @@ def create_access_token(*, subject: str, role: UserRole, expires_delta: timedelt
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> User:
+    return await user_from_token(token, db)
+
+
+async def user_from_token(token: str, db: AsyncSession) -> User:
+    """The active user ``token`` was issued to, or a 401 ``HTTPException``."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,18 +74,38 @@ def get_current_user(
     except ValueError:
         raise credentials_exception
 
-    user: User | None = (
-        db.query(User).filter(User.id == user_id, User.is_active.is_(True)).one_or_none()
-    )
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    user = (
+        await db.execute(select(User).where(User.id == user_id, User.is_active.is_(True)))
+    ).scalar_one_or_none()
     if not user:
         raise credentials_exception
+    db.expunge(user)
+    user_cache.set(user_id, user)
     return user
 
 
+async def publish_user_changed(db: AsyncSession, user_id: UUID) -> None:
+    """Tell every process to drop its cached copy of a user; delivered when ``db`` commits.
+
+    Call it in the transaction that changes the user's role or active state.
+    Each process's ``app.live`` listener invalidates the entry on receipt.
+    """
+    await db.execute(select(func.pg_notify(USER_CHANNEL, str(user_id))))
+
+
+def invalidate_cached_user(user_id: UUID) -> None:
+    """Drop a cached user in this process, without waiting for the notification."""
+    user_cache.invalidate(user_id)
+
+
 def require_roles(*allowed_roles: UserRole):
     allowed_set = set(allowed_roles)
 
-    def dependency(current_user: User = Depends(get_current_user)) -> User:
+    async def dependency(current_user: User = Depends(get_current_user)) -> User:
         if current_user.role in allowed_set or current_user.role == UserRole.SUPERADMIN:
             return current_user
         raise HTTPException(
@@ -9,7 +9,8 @@ from urllib.parse import quote_plus
 
 from dotenv import load_dotenv
 
-DOTENV_PATH = Path(__file__).resolve().parent.parent / ".env"
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DOTENV_PATH = BACKEND_DIR / ".env"
 if DOTENV_PATH.exists():
     load_dotenv(dotenv_path=DOTENV_PATH)
 
@@ -26,6 +27,18 @@ def _int_env(key: str, default: int) -> int:
     return int(raw) if raw is not None else default
 
 
+def _float_env(key: str, default: float) -> float:
+    raw = os.getenv(key)
+    return float(raw) if raw is not None else default
+
+
+def _bool_env(key: str, default: bool) -> bool:
+    raw = os.getenv(key)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
 def _list_env(key: str, default: list[str]) -> list[str]:
     raw = os.getenv(key)
     if raw is None:
@@ -50,10 +63,46 @@ class Settings:
     database_name: str
     database_user: str
     database_password: str
+    database_replica_urls: list[str]
+    database_pool_size: int
+    database_max_overflow: int
+    database_pool_timeout: int
+    database_pool_recycle: int
+    database_pool_pre_ping: bool
+    database_statement_timeout_ms: int
+    database_slow_query_ms: int
 
     jwt_secret_key: str
     jwt_algorithm: str
     access_token_expire_minutes: int
+    user_cache_ttl_seconds: int
+    user_cache_max_size: int
+    bcrypt_rounds: int
+    password_hash_workers: int
+    password_hash_queue_timeout: float
+
+    email_outbox_poll_seconds: float
+    email_outbox_batch_size: int
+    email_outbox_max_attempts: int
+    email_outbox_retention_days: int
+    rate_limit_backend: str
+    rate_limit_trust_forwarded: bool
+    rate_limit_forwarded_hops: int
+    rate_limit_request_code_ip: str
+    rate_limit_request_code_email: str
+    rate_limit_login_ip: str
+    rate_limit_login_identifier: str
+    maintenance_interval_seconds: int
+    maintenance_batch_size: int
+    about_snapshot_poll_seconds: float
+    live_max_subscribers: int
+    live_queue_size: int
+    live_heartbeat_seconds: float
+    metrics_enabled: bool
+    metrics_token: str
+    profile_sample_rate: float
+    profile_interval_ms: int
+    profile_dir: str
 
     superadmin_email: str
     superadmin_username: str
@@ -63,6 +112,18 @@ class Settings:
     default_theme: str
     app_timezone: str
     cors_allow_origins: list[str]
+    image_variant_widths: list[int]
+    image_variant_formats: list[str]
+    image_workers: int
+
+    storage_backend: str
+    upload_dir: str
+    s3_bucket: str
+    s3_endpoint_url: Optional[str]
+    s3_region: Optional[str]
+    s3_access_key_id: Optional[str]
+    s3_secret_access_key: Optional[str]
+    s3_public_base_url: Optional[str]
 
     about_default_sections: dict[str, str] = field(
         default_factory=lambda: {
@@ -99,9 +160,45 @@ def get_settings() -> Settings:
         database_name=_env("DB_NAME", "ituhouse"),
         database_user=_env("DB_USER", "postgres"),
         database_password=_env("DB_PASSWORD", "postgres"),
+        database_replica_urls=_list_env("DATABASE_REPLICA_URLS", []),
+        database_pool_size=_int_env("DB_POOL_SIZE", 10),
+        database_max_overflow=_int_env("DB_MAX_OVERFLOW", 20),
+        database_pool_timeout=_int_env("DB_POOL_TIMEOUT", 30),
+        database_pool_recycle=_int_env("DB_POOL_RECYCLE", 1800),
+        database_pool_pre_ping=_bool_env("DB_POOL_PRE_PING", True),
+        database_statement_timeout_ms=_int_env("DB_STATEMENT_TIMEOUT_MS", 0),
+        database_slow_query_ms=_int_env("DB_SLOW_QUERY_MS", 500),
         jwt_secret_key=_env("JWT_SECRET_KEY", required=True),
         jwt_algorithm=_env("JWT_ALGORITHM", "HS256"),
         access_token_expire_minutes=_int_env("ACCESS_TOKEN_EXPIRE_MINUTES", 60 * 24),
+        user_cache_ttl_seconds=_int_env("USER_CACHE_TTL_SECONDS", 30),
+        user_cache_max_size=_int_env("USER_CACHE_MAX_SIZE", 10_000),
+        bcrypt_rounds=_int_env("BCRYPT_ROUNDS", 12),
+        password_hash_workers=_int_env("PASSWORD_HASH_WORKERS", 2),
+        password_hash_queue_timeout=_float_env("PASSWORD_HASH_QUEUE_TIMEOUT", 5.0),
+        email_outbox_poll_seconds=_float_env("EMAIL_OUTBOX_POLL_SECONDS", 5.0),
+        email_outbox_batch_size=_int_env("EMAIL_OUTBOX_BATCH_SIZE", 20),
+        email_outbox_max_attempts=_int_env("EMAIL_OUTBOX_MAX_ATTEMPTS", 6),
+        email_outbox_retention_days=_int_env("EMAIL_OUTBOX_RETENTION_DAYS", 7),
+        rate_limit_backend=_env("RATE_LIMIT_BACKEND", "memory"),
+        rate_limit_trust_forwarded=_bool_env("RATE_LIMIT_TRUST_FORWARDED", False),
+        rate_limit_forwarded_hops=_int_env("RATE_LIMIT_FORWARDED_HOPS", 1),
+        rate_limit_request_code_ip=_env("RATE_LIMIT_REQUEST_CODE_IP", "20/hour"),
+        rate_limit_request_code_email=_env("RATE_LIMIT_REQUEST_CODE_EMAIL", "5/hour"),
+        rate_limit_login_ip=_env("RATE_LIMIT_LOGIN_IP", "30/minute"),
+        rate_limit_login_identifier=_env("RATE_LIMIT_LOGIN_IDENTIFIER", "10/minute"),
+        maintenance_interval_seconds=_int_env("MAINTENANCE_INTERVAL_SECONDS", 15 * 60),
+        maintenance_batch_size=_int_env("MAINTENANCE_BATCH_SIZE", 1000),
+        about_snapshot_poll_seconds=_float_env("ABOUT_SNAPSHOT_POLL_SECONDS", 2.0),
+        live_max_subscribers=_int_env("LIVE_MAX_SUBSCRIBERS", 1000),
+        live_queue_size=_int_env("LIVE_QUEUE_SIZE", 64),
+        live_heartbeat_seconds=_float_env("LIVE_HEARTBEAT_SECONDS", 15.0),
+        metrics_enabled=_bool_env("METRICS_ENABLED", True),
+        metrics_token=_env("METRICS_TOKEN", ""),
+        profile_sample_rate=_float_env("PROFILE_SAMPLE_RATE", 0.0),
+        profile_interval_ms=_int_env("PROFILE_INTERVAL_MS", 5),
+        # Empty means the default, never the working directory.
+        profile_dir=_env("PROFILE_DIR") or str(BACKEND_DIR / "profiles"),
         superadmin_email=_env("SUPERADMIN_EMAIL", required=True),
         superadmin_username=_env("SUPERADMIN_USERNAME", "ituhouse-root"),
         superadmin_password=_env("SUPERADMIN_PASSWORD", required=True),
@@ -109,4 +206,15 @@ def get_settings() -> Settings:
         default_theme=_env("DEFAULT_THEME", "system"),
         app_timezone=_env("APP_TIMEZONE", "Asia/Shanghai"),
         cors_allow_origins=_list_env("CORS_ALLOW_ORIGINS", ["http://localhost:3000"]),
+        image_variant_widths=[int(width) for width in _list_env("IMAGE_VARIANT_WIDTHS", ["320", "640", "1280"])],
+        image_variant_formats=[fmt.lower() for fmt in _list_env("IMAGE_VARIANT_FORMATS", ["webp", "avif"])],
+        image_workers=_int_env("IMAGE_WORKERS", 1),
+        storage_backend=_env("STORAGE_BACKEND", "local"),
+        upload_dir=_env("UPLOAD_DIR", str(BACKEND_DIR / "uploads")),
+        s3_bucket=_env("S3_BUCKET", ""),
+        s3_endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+        s3_region=os.getenv("S3_REGION"),
+        s3_access_key_id=os.getenv("S3_ACCESS_KEY_ID"),
+        s3_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY"),
+        s3_public_base_url=os.getenv("S3_PUBLIC_BASE_URL"),
     )
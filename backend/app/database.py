@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
-from typing import Iterator
+from functools import lru_cache
+from itertools import cycle
+from typing import Any, AsyncIterator, Iterator
 
 from sqlalchemy import create_engine, text
-from sqlalchemy.engine import make_url
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
 from .config import get_settings
+from .metrics import TimedQueuePool, instrument_engine
 
 
 class Base(DeclarativeBase):
@@ -17,47 +22,103 @@ class Base(DeclarativeBase):
 settings = get_settings()
 _database_url = make_url(settings.database_url)
 
+# Engines are built on first use so importing the app never touches the database.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
-def _ensure_database_exists() -> None:
-    """Create the configured database if it does not already exist."""
-    if _database_url.drivername.split("+")[0] != "postgresql":
-        return  # only PostgreSQL requires manual provisioning here
 
-    admin_url = _database_url.set(database="postgres")
+def _create_database() -> None:
+    """Create the configured database through the maintenance database."""
+    db_name = _database_url.database
+    if not db_name:
+        raise ValueError("Database name missing from DATABASE_URL")
+
     admin_engine = create_engine(
-        admin_url,
+        _database_url.set(database="postgres"),
         isolation_level="AUTOCOMMIT",
         future=True,
     )
-    db_name = _database_url.database
+    try:
+        with admin_engine.connect() as connection:
+            result = connection.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": db_name},
+            ).scalar()
+            if not result:
+                connection.execute(text(f'CREATE DATABASE "{db_name}"'))
+    finally:
+        admin_engine.dispose()
 
-    if not db_name:
-        raise ValueError("Database name missing from DATABASE_URL")
 
-    with admin_engine.connect() as connection:
-        result = connection.execute(
-            text("SELECT 1 FROM pg_database WHERE datname = :name"),
-            {"name": db_name},
-        ).scalar()
-        if not result:
-            connection.execute(text(f'CREATE DATABASE "{db_name}"'))
+def connect_creating_database() -> Connection:
+    """Connect with the sync engine, creating the database if it is missing."""
+    try:
+        return get_engine().connect()
+    except OperationalError:
+        # libpq does not report a SQLSTATE for connection failures, so let the
+        # catalog check decide whether the database is actually missing.
+        if _database_url.drivername.split("+")[0] != "postgresql":
+            raise
+    _create_database()
+    return get_engine().connect()
+
+
+@lru_cache()
+def get_engine() -> Engine:
+    """Sync engine for startup initialization and maintenance scripts."""
+    return create_engine(
+        settings.database_url,
+        future=True,
+        pool_pre_ping=True,
+    )
+
+
+def _request_engine_options(url: str) -> dict[str, Any]:
+    options: dict[str, Any] = {
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_timeout": settings.database_pool_timeout,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_pre_ping": settings.database_pool_pre_ping,
+        "poolclass": TimedQueuePool,
+    }
+    timeout_ms = settings.database_statement_timeout_ms
+    if timeout_ms > 0 and make_url(url).drivername.split("+")[0] == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """Async engine for request handlers; unlike the sync engine it enforces the statement timeout."""
+    engine = create_async_engine(
+        settings.database_url,
+        **_request_engine_options(settings.database_url),
+    )
+    instrument_engine(engine.sync_engine, "primary")
+    return engine
 
 
-_ensure_database_exists()
+@lru_cache()
+def get_replica_engines() -> tuple[AsyncEngine, ...]:
+    engines = tuple(
+        create_async_engine(url, **_request_engine_options(url)) for url in settings.database_replica_urls
+    )
+    for index, engine in enumerate(engines):
+        instrument_engine(engine.sync_engine, f"replica-{index}")
+    return engines
 
-engine = create_engine(
-    settings.database_url,
-    future=True,
-    pool_pre_ping=True,
-)
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+@lru_cache()
+def _replica_cycle() -> Iterator[AsyncEngine] | None:
+    replicas = get_replica_engines()
+    return cycle(replicas) if replicas else None
 
 
 @contextmanager
 def session_scope() -> Iterator[Session]:
     """Provide a transactional scope for scripts."""
-    session = SessionLocal()
+    session = SessionLocal(bind=get_engine())
     try:
         yield session
         session.commit()
@@ -68,7 +129,26 @@ def session_scope() -> Iterator[Session]:
         session.close()
 
 
-def get_db() -> Iterator[Session]:
-    """FastAPI dependency that yields a database session."""
-    with session_scope() as session:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency that yields an async database session."""
+    async with AsyncSessionLocal(bind=get_async_engine()) as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def get_read_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency for read-only routes, round-robined across replicas."""
+    replicas = _replica_cycle()
+    bind = next(replicas) if replicas else get_async_engine()
+    async with AsyncSessionLocal(bind=bind) as session:
         yield session
+
+
+async def dispose_engines() -> None:
+    await get_async_engine().dispose()
+    for replica in get_replica_engines():
+        await replica.dispose()
@@ -1,26 +1,41 @@
 from __future__ import annotations
 
+from collections import deque
 import json
 import logging
 import os
 from email.message import EmailMessage
 from pathlib import Path
 import smtplib
-from typing import Any
+from threading import Lock
+import time
+from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent.parent / "email_senders.json"
+SMTP_TIMEOUT_SECONDS = 15
+# Servers typically drop idle sessions after a few minutes; reconnect before that happens.
+SMTP_IDLE_SECONDS = 60
+# Consecutive failures that open a sender's circuit, and how long it stays open
+# (doubling on every re-trip up to the maximum).
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_OPEN_SECONDS = 30.0
+CIRCUIT_MAX_OPEN_SECONDS = 15 * 60.0
+RATE_WINDOW_SECONDS = 60.0
+LATENCY_SMOOTHING = 0.2
 
+_config_lock = Lock()
+_config_cache: Optional[tuple[Path, float, list[dict[str, Any]]]] = None
 
-def _load_sender_configs() -> list[dict[str, Any]]:
-    """Load SMTP sender configurations from JSON file."""
+
+def _config_path() -> Path:
     config_path = os.getenv("EMAIL_SENDERS_FILE")
-    path = Path(config_path) if config_path else DEFAULT_CONFIG_PATH
-    if not path.exists():
-        logger.warning("Email sender config file not found at %s", path)
-        return []
+    return Path(config_path) if config_path else DEFAULT_CONFIG_PATH
+
 
+def _parse_sender_configs(path: Path) -> list[dict[str, Any]]:
+    """Load SMTP sender configurations from JSON file."""
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
     except Exception as exc:  # pragma: no cover - log unexpected parse errors
@@ -44,18 +59,274 @@ def _load_sender_configs() -> list[dict[str, Any]]:
     return valid_configs
 
 
-def _send_with_config(config: dict[str, Any], message: EmailMessage) -> None:
-    host = config["host"]
-    port = int(config.get("port", 587))
-    use_ssl = bool(config.get("use_ssl", False))
-    use_tls = bool(config.get("use_tls", not use_ssl))
+def _load_sender_configs() -> list[dict[str, Any]]:
+    """Return sender configs, re-reading the file only when its mtime changes."""
+    global _config_cache
+    path = _config_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        logger.warning("Email sender config file not found at %s", path)
+        return []
+
+    with _config_lock:
+        if _config_cache is None or _config_cache[0] != path or _config_cache[1] != mtime:
+            _config_cache = (path, mtime, _parse_sender_configs(path))
+        return _config_cache[2]
+
+
+def has_sender_configs() -> bool:
+    return bool(_load_sender_configs())
+
+
+def _sender_key(config: dict[str, Any]) -> tuple[str, int, str]:
+    return (config["host"], int(config.get("port", 587)), config["username"])
+
+
+def _sender_name(config: dict[str, Any]) -> str:
+    return config.get("name", config["from_email"])
+
+
+class _SenderHealth:
+    """Circuit breaker, send-rate window and counters for one SMTP account.
+
+    Guarded by ``_health_lock``; every method assumes the caller holds it.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.current_weight = 0
+        self.recent_sends: deque[float] = deque()
+        self.sent = 0
+        self.failed = 0
+        self.short_circuited = 0
+        self.rate_limited = 0
+        self.latency_avg = 0.0
+        self.latency_max = 0.0
+        self.configure(config)
+
+    def configure(self, config: dict[str, Any]) -> None:
+        self.name = _sender_name(config)
+        self.weight = max(0, int(config.get("weight", 1)))
+        self.max_per_minute = max(0, int(config.get("max_per_minute", 0)))
+
+    def state(self, at: float) -> str:
+        if self.consecutive_failures < CIRCUIT_FAILURE_THRESHOLD:
+            return "closed"
+        return "open" if at < self.open_until else "half_open"
+
+    def _window(self, at: float) -> int:
+        while self.recent_sends and at - self.recent_sends[0] >= RATE_WINDOW_SECONDS:
+            self.recent_sends.popleft()
+        return len(self.recent_sends)
+
+    def blocked_by(self, at: float) -> Optional[str]:
+        state = self.state(at)
+        if state == "open" or (state == "half_open" and self.probing):
+            return "circuit"
+        if self.max_per_minute and self._window(at) >= self.max_per_minute:
+            return "rate"
+        return None
+
+    def skipped(self, reason: str) -> None:
+        if reason == "circuit":
+            self.short_circuited += 1
+        else:
+            self.rate_limited += 1
+
+    def acquire(self, at: float) -> bool:
+        """Reserve one send; half-open senders admit a single probe at a time."""
+        blocked = self.blocked_by(at)
+        if blocked is not None:
+            self.skipped(blocked)
+            return False
+        if self.state(at) == "half_open":
+            self.probing = True
+        self.recent_sends.append(at)
+        return True
+
+    def _observe(self, latency: float) -> None:
+        self.latency_avg = latency if not (self.sent + self.failed) else (
+            LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency_avg
+        )
+        self.latency_max = max(self.latency_max, latency)
+
+    def record_success(self, latency: float) -> None:
+        self._observe(latency)
+        self.sent += 1
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.probing = False
+
+    def record_failure(self, latency: float, at: float) -> None:
+        self._observe(latency)
+        self.failed += 1
+        self.consecutive_failures += 1
+        self.probing = False
+        if self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self.trips += 1
+            self.open_until = at + min(CIRCUIT_OPEN_SECONDS * 2 ** (self.trips - 1), CIRCUIT_MAX_OPEN_SECONDS)
+            if self.trips == 1:
+                logger.warning("Email sender %s disabled after %s failures", self.name, self.consecutive_failures)
+
+    def snapshot(self, at: float) -> dict[str, Any]:
+        state = self.state(at)
+        return {
+            "name": self.name,
+            "state": state,
+            "weight": self.weight,
+            "max_per_minute": self.max_per_minute,
+            "sends_last_minute": self._window(at),
+            "sent": self.sent,
+            "failed": self.failed,
+            "consecutive_failures": self.consecutive_failures,
+            "short_circuited": self.short_circuited,
+            "rate_limited": self.rate_limited,
+            "open_for_seconds": round(self.open_until - at, 1) if state == "open" else 0.0,
+            "latency_avg_ms": round(self.latency_avg * 1000, 1),
+            "latency_max_ms": round(self.latency_max * 1000, 1),
+        }
 
-    smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
-    with smtp_class(host=host, port=port, timeout=15) as server:
-        if use_tls and not use_ssl:
-            server.starttls()
-        server.login(config["username"], config["password"])
-        server.send_message(message)
+
+_health_lock = Lock()
+_health: dict[tuple[str, int, str], _SenderHealth] = {}
+
+
+def _health_for(config: dict[str, Any]) -> _SenderHealth:
+    key = _sender_key(config)
+    health = _health.get(key)
+    if health is None:
+        health = _health[key] = _SenderHealth(config)
+    else:
+        health.configure(config)
+    return health
+
+
+def _send_order(configs: list[dict[str, Any]]) -> list[tuple[dict[str, Any], _SenderHealth]]:
+    """Order usable senders by smooth weighted round-robin.
+
+    The first entry is the weighted pick for this message; the rest are
+    fallbacks in descending current weight. Senders with an open circuit or a
+    full rate window are left out so a dead account costs no timeout.
+    """
+    with _health_lock:
+        at = time.monotonic()
+        candidates: list[tuple[dict[str, Any], _SenderHealth]] = []
+        for config in configs:
+            health = _health_for(config)
+            blocked = health.blocked_by(at)
+            if blocked is None:
+                candidates.append((config, health))
+            else:
+                health.skipped(blocked)
+        total = sum(health.weight for _, health in candidates)
+        for _, health in candidates:
+            health.current_weight += health.weight
+        candidates.sort(key=lambda candidate: candidate[1].current_weight, reverse=True)
+        if candidates:
+            candidates[0][1].current_weight -= total
+        return candidates
+
+
+def senders_throttled() -> bool:
+    """True when accounts are configured but every one is circuit-open or rate-limited."""
+    configs = _load_sender_configs()
+    if not configs:
+        return False
+    with _health_lock:
+        at = time.monotonic()
+        return all(_health_for(config).blocked_by(at) is not None for config in configs)
+
+
+def sender_stats() -> list[dict[str, Any]]:
+    configs = _load_sender_configs()
+    with _health_lock:
+        at = time.monotonic()
+        return [_health_for(config).snapshot(at) for config in configs]
+
+
+class _PooledSMTPConnection:
+    """One authenticated SMTP session per sender, reused across messages."""
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.config = config
+        self.lock = Lock()
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        config = self.config
+        host = config["host"]
+        port = int(config.get("port", 587))
+        use_ssl = bool(config.get("use_ssl", False))
+        use_tls = bool(config.get("use_tls", not use_ssl))
+
+        smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+        server = smtp_class(host=host, port=port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if use_tls and not use_ssl:
+                server.starttls()
+            server.login(config["username"], config["password"])
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:  # pragma: no cover - connection already gone
+                self._server.close()
+        self._server = None
+
+    def send(self, message: EmailMessage) -> None:
+        with self.lock:
+            if self._server is not None and time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+                self.close()
+            reused = self._server is not None
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if not reused:
+                    raise
+                # the pooled session went stale between messages; retry once on a fresh one
+                self._server = self._connect()
+                self._server.send_message(message)
+            except Exception:
+                self.close()
+                raise
+            self._last_used = time.monotonic()
+
+
+_connections_lock = Lock()
+_connections: dict[tuple[str, int, str], _PooledSMTPConnection] = {}
+
+
+def _connection_for(config: dict[str, Any]) -> _PooledSMTPConnection:
+    key = _sender_key(config)
+    with _connections_lock:
+        connection = _connections.get(key)
+        if connection is None or connection.config != config:
+            if connection is not None:
+                connection.close()
+            connection = _PooledSMTPConnection(config)
+            _connections[key] = connection
+        return connection
+
+
+def close_smtp_connections() -> None:
+    with _connections_lock:
+        for connection in _connections.values():
+            with connection.lock:
+                connection.close()
+        _connections.clear()
 
 
 def send_email(
@@ -65,13 +336,16 @@ def send_email(
     body: str,
     from_name: str | None = None,
 ) -> bool:
-    """Send an email using the configured SMTP accounts sequentially."""
+    """Send an email through the healthy SMTP accounts, weighted pick first."""
     configs = _load_sender_configs()
     if not configs:
         logger.warning("No SMTP configurations available for sending email.")
         return False
 
-    for config in configs:
+    for config, health in _send_order(configs):
+        with _health_lock:
+            if not health.acquire(time.monotonic()):
+                continue
         from_email = config["from_email"]
         email_message = EmailMessage()
         display_from = f"{from_name} <{from_email}>" if from_name else from_email
@@ -80,23 +354,29 @@ def send_email(
         email_message["To"] = to_email
         email_message.set_content(body)
 
+        started = time.monotonic()
         try:
-            _send_with_config(config, email_message)
-            logger.info("Sent email to %s using %s", to_email, config.get("name", from_email))
-            return True
+            _connection_for(config).send(email_message)
         except Exception as exc:  # pragma: no cover - rely on runtime logging
+            finished = time.monotonic()
+            with _health_lock:
+                health.record_failure(finished - started, finished)
             logger.warning(
                 "Failed to send email via %s: %s",
                 config.get("name", from_email),
                 exc,
             )
             continue
+        with _health_lock:
+            health.record_success(time.monotonic() - started)
+        logger.info("Sent email to %s using %s", to_email, config.get("name", from_email))
+        return True
 
     logger.error("Unable to send email to %s using any configured SMTP account.", to_email)
     return False
 
 
-def send_verification_email(*, to_email: str, code: str, app_name: str) -> bool:
+def build_verification_email(*, code: str, app_name: str) -> tuple[str, str]:
     subject = f"{app_name} 验证码 / Verification Code"
     body = (
         f"您好！\n\n您的验证码是：{code}\n"
@@ -105,4 +385,9 @@ def send_verification_email(*, to_email: str, code: str, app_name: str) -> bool:
         f"Your verification code is: {code}\n"
         "It will expire in 15 minutes.\n"
     )
+    return subject, body
+
+
+def send_verification_email(*, to_email: str, code: str, app_name: str) -> bool:
+    subject, body = build_verification_email(code=code, app_name=app_name)
     return send_email(to_email=to_email, subject=subject, body=body, from_name=app_name)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Any, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .config import get_settings
+
+T = TypeVar("T")
+
+settings = get_settings()
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _get_pool() -> tuple[ProcessPoolExecutor, asyncio.Semaphore]:
+    global _executor, _slots
+    if _executor is None or _slots is None:
+        workers = max(1, settings.password_hash_workers)
+        # spawn keeps the workers free of the parent's event loop and DB connections
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _slots = asyncio.Semaphore(workers)
+    return _executor, _slots
+
+
+async def _run(func: Callable[..., T], *args: Any) -> T:
+    executor, slots = _get_pool()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=settings.password_hash_queue_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    finally:
+        slots.release()
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the worker pool."""
+    return await _run(_hash, password)
+
+
+async def verify_and_update_password(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify a password on the worker pool.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    uses an outdated scheme or cost factor and should be replaced.
+    """
+    return await _run(_verify_and_update, password, hashed_password)
+
+
+def shutdown_password_pool() -> None:
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _slots = None
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+import logging
+import multiprocessing
+from pathlib import PurePosixPath
+from typing import Optional
+
+from .config import get_settings
+from .storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Animated GIFs would lose their animation, so they are served as uploaded.
+_SKIPPED_EXTENSIONS = {".gif"}
+_SAVE_OPTIONS: dict[str, dict[str, int]] = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60, "speed": 8},
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+@lru_cache()
+def _supported_formats() -> tuple[str, ...]:
+    try:
+        from PIL import features
+    except ImportError:
+        logger.warning("Pillow is not installed; image variants are disabled")
+        return ()
+    return tuple(fmt for fmt in settings.image_variant_formats if features.check(fmt))
+
+
+def variant_name(filename: str, width: int, fmt: str) -> str:
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}_w{width}.{fmt}"
+
+
+def planned_variants(filename: str) -> list[tuple[int, str, str]]:
+    """Return ``(width, format, name)`` for every variant that will be generated."""
+    if PurePosixPath(filename).suffix.lower() in _SKIPPED_EXTENSIONS:
+        return []
+    return [
+        (width, fmt, variant_name(filename, width, fmt))
+        for width in settings.image_variant_widths
+        for fmt in _supported_formats()
+    ]
+
+
+def _render_variants(data: bytes, widths: list[int], formats: tuple[str, ...]) -> list[tuple[int, str, bytes]]:
+    """Decode once and encode each width-bounded variant; runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    rendered: list[tuple[int, str, bytes]] = []
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        for width in widths:
+            variant = image.copy()
+            # thumbnail keeps the aspect ratio and never upscales
+            variant.thumbnail((width, variant.height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                buffer = BytesIO()
+                variant.save(buffer, format=fmt.upper(), **_SAVE_OPTIONS.get(fmt, {}))
+                rendered.append((width, fmt, buffer.getvalue()))
+    return rendered
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, settings.image_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def generate_variants(storage: StorageBackend, key: str) -> None:
+    """Background task: store the planned variants of ``key`` alongside it."""
+    if not planned_variants(key):
+        return
+    try:
+        data = await storage.read_bytes(key)
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            _get_executor(),
+            _render_variants,
+            data,
+            settings.image_variant_widths,
+            _supported_formats(),
+        )
+        for width, fmt, payload in rendered:
+            await storage.write_bytes(variant_name(key, width, fmt), payload, content_type=f"image/{fmt}")
+    except Exception:  # pragma: no cover - keep serving the original on failure
+        logger.exception("Failed to generate image variants for %s", key)
+
+
+def shutdown_image_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
@@ -1,26 +1,39 @@
 from __future__ import annotations
 
+import logging
+import time
+
 from .timezone import now
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from .auth import get_password_hash
+from .about import ABOUT_SECTIONS, bump_version_statement
+from .auth import get_password_hash, normalize_email, verify_password
 from .config import get_settings
-from .database import Base, engine
+from .database import get_engine
+from .migrations import run_migrations
 from .models import AboutSection, User, UserRole
 
+logger = logging.getLogger(__name__)
+
 
 def run_initialization() -> None:
-    """Create tables and seed initial entities."""
-    Base.metadata.create_all(bind=engine)
+    """Apply pending migrations and seed initial entities."""
+    started = time.perf_counter()
+    applied = run_migrations()
 
     settings = get_settings()
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         session.expire_on_commit = False
         _ensure_super_admin(session, settings)
         _ensure_about_sections(session, settings)
         session.commit()
+    logger.info(
+        "Initialization finished in %.3fs (%d migrations applied)",
+        time.perf_counter() - started,
+        applied,
+    )
 
 
 def _ensure_super_admin(session: Session, settings) -> None:
@@ -29,19 +42,30 @@ def _ensure_super_admin(session: Session, settings) -> None:
     ).scalar_one_or_none()
 
     if existing:
-        existing.username = settings.superadmin_username
-        existing.email = settings.superadmin_email
-        existing.hashed_password = get_password_hash(settings.superadmin_password)
-        existing.preferred_locale = settings.default_locale
-        existing.preferred_theme = settings.default_theme
-        existing.email_verified = True
-        existing.is_active = True
-        existing.updated_at = now()
+        desired = {
+            "username": settings.superadmin_username,
+            "email": normalize_email(settings.superadmin_email),
+            "preferred_locale": settings.default_locale,
+            "preferred_theme": settings.default_theme,
+            "email_verified": True,
+            "is_active": True,
+        }
+        changed = False
+        for attribute, value in desired.items():
+            if getattr(existing, attribute) != value:
+                setattr(existing, attribute, value)
+                changed = True
+        # bcrypt is slow by design: only rehash when the configured password changed.
+        if not verify_password(settings.superadmin_password, existing.hashed_password):
+            existing.hashed_password = get_password_hash(settings.superadmin_password)
+            changed = True
+        if changed:
+            existing.updated_at = now()
         return
 
     user = User(
         username=settings.superadmin_username,
-        email=settings.superadmin_email,
+        email=normalize_email(settings.superadmin_email),
         hashed_password=get_password_hash(settings.superadmin_password),
         role=UserRole.SUPERADMIN,
         preferred_locale=settings.default_locale,
@@ -72,3 +96,4 @@ def _ensure_about_sections(session: Session, settings) -> None:
             updated_at=now(),
         )
         session.add(section)
+    session.execute(bump_version_statement(ABOUT_SECTIONS))
@@ -0,0 +1,225 @@
+"""Push new posts and comments to connected clients over Server-Sent Events.
+
+Writers call the ``publish_*`` helpers inside their transaction. They issue
+``pg_notify``, so an event is delivered only if the write commits, and to
+every worker process. Each process holds one LISTEN connection and fans the
+notifications out to its own subscribers through ``LiveBroker``.
+
+Every subscriber has a bounded queue. A client that reads too slowly stops
+draining it (the server blocks on its socket), and once it falls
+``LIVE_QUEUE_SIZE`` events behind its backlog is dropped in favour of a single
+``resync`` event telling it to refetch. Memory per connection stays bounded
+no matter how slow the client is.
+
+The same connection listens for ``app.auth.USER_CHANNEL`` and drops users
+from this process's ``user_cache`` when their role or active state changes.
+Notifications sent while it is reconnecting are lost, so the whole cache is
+cleared when it loses the connection and again once it is back.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+import psycopg
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .auth import USER_CHANNEL, user_cache
+from .config import get_settings
+from .models import Comment, Post, User
+from .schemas import CommentResponse, PostSummary
+from .serialization import excerpt_fields
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CHANNEL = "ituhouse_live"
+POST_CREATED = "post_created"
+COMMENT_CREATED = "comment_created"
+# NOTIFY rejects payloads of 8000 bytes or more.
+MAX_PAYLOAD_BYTES = 7900
+RECONNECT_MAX_SECONDS = 30.0
+
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+KEEPALIVE_FRAME = b": keep-alive\n\n"
+# Tells EventSource how long to wait before reconnecting.
+RETRY_FRAME = b"retry: 3000\n\n"
+
+_post_summary_adapter = TypeAdapter(PostSummary)
+_comment_adapter = TypeAdapter(CommentResponse)
+
+
+def _author(user: User) -> dict[str, Any]:
+    return {"id": user.id, "username": user.username, "role": user.role}
+
+
+async def _notify(db: AsyncSession, event: str, post_id: UUID, data: bytes, fallback: dict[str, Any]) -> None:
+    payload = b'{"event":"%s","post_id":"%s","data":%s}' % (event.encode(), str(post_id).encode(), data)
+    if len(payload) > MAX_PAYLOAD_BYTES:
+        # Clients fetch the full item by id instead.
+        payload = json.dumps({"event": event, "post_id": str(post_id), "data": fallback}).encode("utf-8")
+    await db.execute(select(func.pg_notify(CHANNEL, payload.decode("utf-8"))))
+
+
+async def publish_post_created(db: AsyncSession, post: Post, author: User) -> None:
+    """Announce a flushed post; delivered when ``db`` commits."""
+    summary = {
+        "id": post.id,
+        "title": post.title,
+        "image_url": post.image_url,
+        "author_id": post.author_id,
+        "author": _author(author),
+        "comment_count": 0,
+        "created_at": post.created_at,
+        "updated_at": post.updated_at,
+        **excerpt_fields(post.content),
+    }
+    data = _post_summary_adapter.dump_json(_post_summary_adapter.validate_python(summary))
+    await _notify(db, POST_CREATED, post.id, data, {"id": str(post.id)})
+
+
+async def publish_comment_created(db: AsyncSession, comment: Comment, author: User) -> None:
+    """Announce a flushed comment; delivered when ``db`` commits."""
+    item = {
+        "id": comment.id,
+        "post_id": comment.post_id,
+        "author_id": comment.author_id,
+        "author": _author(author),
+        "content": comment.content,
+        "created_at": comment.created_at,
+    }
+    data = _comment_adapter.dump_json(_comment_adapter.validate_python(item))
+    await _notify(db, COMMENT_CREATED, comment.post_id, data, {"id": str(comment.id), "post_id": str(comment.post_id)})
+
+
+class Subscription:
+    """One client connection: the feed when ``post_id`` is None, otherwise one post's comments."""
+
+    def __init__(self, post_id: Optional[UUID]) -> None:
+        self.post_id = post_id
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=max(settings.live_queue_size, 1))
+
+    def wants(self, event: str, post_id: str) -> bool:
+        if self.post_id is None:
+            return event == POST_CREATED
+        return event == COMMENT_CREATED and post_id == str(self.post_id)
+
+    def offer(self, frame: bytes) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+
+
+class LiveBroker:
+    def __init__(self) -> None:
+        self._subscribers: set[Subscription] = set()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def check_capacity(self) -> None:
+        """Refuse a new stream up front, while the response can still be a 503."""
+        if len(self._subscribers) >= settings.live_max_subscribers:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many live connections")
+
+    async def stream(self, post_id: Optional[UUID]) -> AsyncIterator[bytes]:
+        """Server-Sent Events for a new subscription, which lasts exactly as long as the stream.
+
+        Subscribing here rather than in the handler means a client that goes
+        away before the first frame never holds a slot.
+        """
+        if len(self._subscribers) >= settings.live_max_subscribers:
+            # Filled up since check_capacity; the client retries after RETRY_FRAME.
+            yield RETRY_FRAME
+            return
+        subscription = Subscription(post_id)
+        self._subscribers.add(subscription)
+        try:
+            yield RETRY_FRAME
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), settings.live_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream and surfaces dead clients.
+                    yield KEEPALIVE_FRAME
+        finally:
+            self._subscribers.discard(subscription)
+
+    def dispatch(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            event, post_id, data = message["event"], message["post_id"], message["data"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed live event %r", payload[:200])
+            return
+        encoded = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        frame = b"event: %s\ndata: %s\n\n" % (event.encode(), encoded)
+        for subscription in self._subscribers:
+            if subscription.wants(event, post_id):
+                subscription.offer(frame)
+
+    def _invalidate_user(self, payload: str) -> None:
+        try:
+            user_cache.invalidate(UUID(payload))
+        except ValueError:
+            # Unknown id format: be safe and forget every cached user.
+            user_cache.clear()
+
+    def _broadcast(self, frame: bytes) -> None:
+        for subscription in self._subscribers:
+            subscription.offer(frame)
+
+    def start(self) -> None:
+        # Also runs with live events disabled while users are cached.
+        if self._task is None and (settings.live_max_subscribers > 0 or settings.user_cache_ttl_seconds > 0):
+            self._task = asyncio.create_task(self._listen(), name="live-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        conninfo = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        delay = 1.0
+        listened_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as connection:
+                    await connection.execute(f"LISTEN {CHANNEL}")
+                    await connection.execute(f"LISTEN {USER_CHANNEL}")
+                    # Anything published while we were not listening is lost.
+                    user_cache.clear()
+                    if listened_before:
+                        self._broadcast(RESYNC_FRAME)
+                    listened_before = True
+                    delay = 1.0
+                    async for notification in connection.notifies():
+                        if notification.channel == USER_CHANNEL:
+                            self._invalidate_user(notification.payload)
+                        else:
+                            self.dispatch(notification.payload)
+            except Exception:  # pragma: no cover - reconnect with backoff
+                logger.exception("Live event listener lost its connection")
+            user_cache.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+live_broker = LiveBroker()
@@ -0,0 +1,234 @@
+"""Periodic cleanup of tables that would otherwise grow without bound, and
+repair of denormalized counters.
+
+Runs inside every app process; ``python -m app.maintenance`` runs one pass
+from cron instead. Purges take disjoint rows in each process, and the
+comment count repair runs in whichever process takes its advisory lock.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import logging
+from typing import Any, Optional
+
+from sqlalchemy import delete, func, or_, select, text, update
+from sqlalchemy.sql.elements import ColumnElement
+
+from .config import get_settings
+from .database import dispose_engines, get_async_engine
+from .models import (
+    Comment,
+    CommentCountDirtyPost,
+    EmailOutbox,
+    EmailOutboxStatus,
+    EmailVerificationCode,
+    Post,
+    RateLimitBucket,
+)
+from .timezone import now
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Every configured limit refills within a day, so older buckets are full and can go.
+RATE_LIMIT_BUCKET_RETENTION = timedelta(days=1)
+# Held for one repair batch; other processes skip the repair meanwhile.
+COMMENT_COUNT_REPAIR_LOCK_ID = 7_315_100_002
+
+# Recounts every post, for migrations and bulk loads; the periodic repair only
+# visits posts in comment_count_dirty_posts. Only rows that disagree are written.
+# The first statement costs one pass over comments; the second a scan of posts
+# that still claim to have comments.
+COMMENT_COUNT_REPAIR_SQL = (
+    """
+    UPDATE posts SET comment_count = actual.count
+    FROM (SELECT post_id, count(*) AS count FROM comments GROUP BY post_id) AS actual
+    WHERE posts.id = actual.post_id AND posts.comment_count <> actual.count
+    """,
+    """
+    UPDATE posts SET comment_count = 0
+    WHERE comment_count <> 0
+      AND NOT EXISTS (SELECT 1 FROM comments WHERE comments.post_id = posts.id)
+    """,
+)
+
+# Records every post whose comments were inserted, deleted or moved, so the
+# repair never has to look at the others.
+COMMENT_COUNT_DIRTY_TRIGGER_SQL = (
+    """
+    CREATE OR REPLACE FUNCTION comments_mark_post_dirty() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO comment_count_dirty_posts (post_id) VALUES (NEW.post_id) ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP <> 'INSERT' THEN
+            INSERT INTO comment_count_dirty_posts (post_id) VALUES (OLD.post_id) ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS comments_mark_post_dirty ON comments",
+    """
+    CREATE TRIGGER comments_mark_post_dirty
+    AFTER INSERT OR DELETE OR UPDATE OF post_id ON comments
+    FOR EACH ROW EXECUTE FUNCTION comments_mark_post_dirty()
+    """,
+)
+
+
+async def _delete_in_batches(model: Any, condition: ColumnElement[bool]) -> int:
+    """Delete matching rows in short transactions so the table is never locked for long."""
+    primary_key = model.__mapper__.primary_key[0]
+    batch_size = settings.maintenance_batch_size
+    deleted = 0
+    while True:
+        doomed = (
+            select(primary_key)
+            .where(condition)
+            .limit(batch_size)
+            # concurrent purges in other processes take different rows instead of waiting
+            .with_for_update(skip_locked=True)
+        )
+        async with get_async_engine().begin() as connection:
+            result = await connection.execute(delete(model).where(primary_key.in_(doomed.scalar_subquery())))
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+async def purge_verification_codes() -> int:
+    return await _delete_in_batches(
+        EmailVerificationCode,
+        or_(EmailVerificationCode.used.is_(True), EmailVerificationCode.expires_at < now()),
+    )
+
+
+async def purge_email_outbox() -> int:
+    cutoff = now() - timedelta(days=settings.email_outbox_retention_days)
+    return await _delete_in_batches(
+        EmailOutbox,
+        (EmailOutbox.status != EmailOutboxStatus.PENDING) & (EmailOutbox.created_at < cutoff),
+    )
+
+
+async def purge_rate_limit_buckets() -> int:
+    return await _delete_in_batches(
+        RateLimitBucket,
+        RateLimitBucket.updated_at < now() - RATE_LIMIT_BUCKET_RETENTION,
+    )
+
+
+async def _repair_comment_count_batch() -> Optional[tuple[int, int]]:
+    """Recount one batch of dirty posts, returning how many were visited and repaired.
+
+    Returns ``None`` when another process holds the lock.
+    """
+    batch_size = settings.maintenance_batch_size
+    async with get_async_engine().begin() as connection:
+        locked = await connection.scalar(
+            text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": COMMENT_COUNT_REPAIR_LOCK_ID}
+        )
+        if not locked:
+            return None
+        post_ids = (
+            await connection.scalars(
+                select(CommentCountDirtyPost.post_id).order_by(CommentCountDirtyPost.post_id).limit(batch_size)
+            )
+        ).all()
+        if not post_ids:
+            return 0, 0
+        # Locking the posts before taking the marks keeps the order create_comment
+        # uses (post, then comment), so the two cannot deadlock. New comments on
+        # these posts wait for the lock, so the counts below include every
+        # committed comment and none can commit behind them.
+        await connection.execute(
+            select(Post.id).where(Post.id.in_(post_ids)).order_by(Post.id).with_for_update(key_share=True)
+        )
+        await connection.execute(delete(CommentCountDirtyPost).where(CommentCountDirtyPost.post_id.in_(post_ids)))
+        actual = (
+            select(func.count())
+            .select_from(Comment)
+            .where(Comment.post_id == Post.id)
+            .scalar_subquery()
+        )
+        result = await connection.execute(
+            update(Post).where(Post.id.in_(post_ids), Post.comment_count != actual).values(comment_count=actual)
+        )
+        return len(post_ids), result.rowcount
+
+
+async def repair_comment_counts() -> Optional[int]:
+    """Reset ``posts.comment_count`` on posts whose comments changed since the last pass.
+
+    Returns ``None`` when another process is already repairing.
+    """
+    repaired = 0
+    while True:
+        batch = await _repair_comment_count_batch()
+        if batch is None:
+            if not repaired:
+                logger.info("Comment count repair is running in another process; skipped")
+                return None
+            break
+        visited, fixed = batch
+        repaired += fixed
+        if visited < settings.maintenance_batch_size:
+            break
+    if repaired:
+        logger.warning("Repaired comment_count on %d posts", repaired)
+    return repaired
+
+
+async def run_maintenance() -> dict[str, Optional[int]]:
+    results = {
+        "verification_codes": await purge_verification_codes(),
+        "email_outbox": await purge_email_outbox(),
+        "rate_limit_buckets": await purge_rate_limit_buckets(),
+        "comment_counts": await repair_comment_counts(),
+    }
+    logger.info("Maintenance results %s", results)
+    return results
+
+
+class MaintenanceWorker:
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None and settings.maintenance_interval_seconds > 0:
+            self._task = asyncio.create_task(self._run(), name="maintenance")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_maintenance()
+            except Exception:  # pragma: no cover - retry on the next tick
+                logger.exception("Maintenance run failed")
+            await asyncio.sleep(settings.maintenance_interval_seconds)
+
+
+maintenance_worker = MaintenanceWorker()
+
+
+async def _main() -> None:
+    try:
+        print(await run_maintenance())
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
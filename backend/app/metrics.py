@@ -0,0 +1,283 @@
+"""Request and database metrics in the Prometheus text format.
+
+``MetricsMiddleware`` times every request and labels it with the route
+template (``/posts/{post_id}``, never the raw path) so label sets stay
+bounded. ``instrument_engine`` hooks SQLAlchemy's cursor events to count the
+queries each request runs and the time they take, and to log statements
+slower than ``DB_SLOW_QUERY_MS`` together with the route that issued them.
+``TimedQueuePool`` records how long requests wait to check out a pooled
+connection, which is the first thing to grow when the pool is too small.
+
+Counters live in process memory. With several uvicorn workers each one
+reports its own, like ``/admin/cache-stats``, so scrape every worker (or run
+one worker per container) and let Prometheus sum them.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextvars import ContextVar
+import logging
+import math
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+SLOW_QUERY_PREVIEW = 500
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        '%s="%s"' % (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # Per label set: per-bucket (non-cumulative) counts, then the sum.
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total[0])}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+
+class Gauge:
+    """Read when scraped, so it never goes stale."""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._callbacks: list[Callable[[], Iterable[tuple[tuple[str, ...], float]]]] = []
+
+    def collect_with(self, callback: Callable[[], Iterable[tuple[tuple[str, ...], float]]]) -> None:
+        self._callbacks.append(callback)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for callback in self._callbacks:
+            for labels, value in callback():
+                yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+http_requests = Counter("http_requests_total", "Requests handled.", ("method", "route", "status"))
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending its last byte.", ("method", "route")
+)
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+http_request_db_duration = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.", ("method", "route")
+)
+db_query_duration = Histogram("db_query_duration_seconds", "Duration of individual SQL statements.")
+db_slow_queries = Counter("db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS.", ("route",))
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",)
+)
+db_pool_connections = Gauge("db_pool_connections", "Connections held by the pool, by state.", ("pool", "state"))
+
+_METRICS = (
+    http_requests,
+    http_request_duration,
+    http_request_db_queries,
+    http_request_db_duration,
+    db_query_duration,
+    db_slow_queries,
+    db_pool_checkout_wait,
+    db_pool_connections,
+)
+
+
+def render_metrics() -> bytes:
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+class RequestStats:
+    """Database work done on behalf of one request."""
+
+    __slots__ = ("scope", "queries", "db_seconds")
+
+    def __init__(self, scope: Scope) -> None:
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_name(self.scope)
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def route_name(scope: Scope) -> str:
+    # Set by the router once it matched; templates keep label cardinality bounded.
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            method, route = scope["method"], stats.route
+            http_requests.inc(method, route, str(status_code))
+            http_request_duration.observe(time.perf_counter() - started, method, route)
+            http_request_db_queries.observe(stats.queries, method, route)
+            http_request_db_duration.observe(stats.db_seconds, method, route)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    db_query_duration.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    threshold_ms = settings.database_slow_query_ms
+    if threshold_ms > 0 and elapsed * 1000 >= threshold_ms:
+        route = stats.route if stats is not None else "background"
+        origin = f"{stats.scope['method']} {route}" if stats is not None else route
+        db_slow_queries.inc(route)
+        # Parameters stay out of the log: they carry emails and password hashes.
+        preview = " ".join(statement.split())[:SLOW_QUERY_PREVIEW]
+        logger.warning("Slow query (%.0f ms) from %s: %s", elapsed * 1000, origin, preview)
+
+
+def _handle_error(context: Any) -> None:
+    # after_cursor_execute does not fire for failed statements.
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time ``engine``'s statements and report its pool as ``name``."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    if not isinstance(engine.pool, TimedQueuePool):
+        return
+    engine.pool.metrics_name = name
+
+    def pool_state() -> Iterable[tuple[tuple[str, ...], float]]:
+        # engine.pool is replaced when the engine is disposed.
+        pool = engine.pool
+        yield (name, "checked_out"), pool.checkedout()
+        yield (name, "idle"), pool.checkedin()
+        yield (name, "overflow"), max(pool.overflow(), 0)
+
+    db_pool_connections.collect_with(pool_state)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each checkout waits, including opening a new connection."""
+
+    metrics_name = "primary"
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started, self.metrics_name)
+
+    def recreate(self) -> TimedQueuePool:
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
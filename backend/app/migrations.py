@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from .database import Base, connect_creating_database
+
+logger = logging.getLogger(__name__)
+
+# Serializes concurrent boots of several workers against the same database.
+MIGRATION_LOCK_ID = 7_315_100_001
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _execute_all(connection: Connection, *statements: str) -> None:
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _baseline(connection: Connection) -> None:
+    # Creates any missing table from the current models. Later migrations must
+    # therefore be idempotent, since a fresh database already has their changes.
+    from . import models  # noqa: F401  (registers the tables on Base.metadata)
+
+    Base.metadata.create_all(bind=connection)
+
+
+def _keyset_indexes(connection: Connection) -> None:
+    _execute_all(
+        connection,
+        "CREATE INDEX IF NOT EXISTS ix_posts_created_at_id ON posts (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_author_id_created_at_id ON posts (author_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_comments_post_id_created_at_id ON comments (post_id, created_at, id)",
+    )
+
+
+def _email_outbox(connection: Connection) -> None:
+    from .models import EmailOutbox
+
+    EmailOutbox.__table__.create(connection, checkfirst=True)
+
+
+def _rate_limit_buckets(connection: Connection) -> None:
+    from .models import RateLimitBucket
+
+    RateLimitBucket.__table__.create(connection, checkfirst=True)
+
+
+def _normalize_emails(connection: Connection) -> None:
+    # Lookups compare the raw column so they can use its index; rows written
+    # before emails were normalized are lowered here. A mixed-case duplicate of
+    # an existing address is left alone rather than violating uq_users_email.
+    _execute_all(
+        connection,
+        """
+        UPDATE users SET email = lower(email)
+        WHERE email <> lower(email)
+          AND NOT EXISTS (SELECT 1 FROM users AS other WHERE other.email = lower(users.email))
+        """,
+        "UPDATE email_verification_codes SET email = lower(email) WHERE email <> lower(email)",
+    )
+
+
+def _post_search(connection: Connection) -> None:
+    from .search import SEARCH_FUNCTIONS_SQL
+
+    _execute_all(
+        connection,
+        "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        *SEARCH_FUNCTIONS_SQL,
+        # fires the trigger to backfill existing rows
+        "UPDATE posts SET title = title",
+        "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING gin (search_vector)",
+    )
+
+
+def _content_versions(connection: Connection) -> None:
+    from .models import ContentVersion
+
+    ContentVersion.__table__.create(connection, checkfirst=True)
+
+
+def _post_comment_count(connection: Connection) -> None:
+    from .maintenance import COMMENT_COUNT_REPAIR_SQL
+
+    _execute_all(
+        connection,
+        "ALTER TABLE posts ADD COLUMN IF NOT EXISTS comment_count integer NOT NULL DEFAULT 0",
+        *COMMENT_COUNT_REPAIR_SQL,
+    )
+
+
+def _search_cjk_unigrams(connection: Connection) -> None:
+    from .search import REINDEX_CJK_POSTS_SQL, SEARCH_FUNCTIONS_SQL
+
+    _execute_all(connection, *SEARCH_FUNCTIONS_SQL, REINDEX_CJK_POSTS_SQL)
+
+
+def _comment_count_dirty_posts(connection: Connection) -> None:
+    from .maintenance import COMMENT_COUNT_DIRTY_TRIGGER_SQL
+    from .models import CommentCountDirtyPost
+
+    CommentCountDirtyPost.__table__.create(connection, checkfirst=True)
+    _execute_all(connection, *COMMENT_COUNT_DIRTY_TRIGGER_SQL)
+
+
+def _content_version_times(connection: Connection) -> None:
+    _execute_all(
+        connection,
+        "ALTER TABLE content_versions ADD COLUMN IF NOT EXISTS updated_at timestamptz "
+        "NOT NULL DEFAULT clock_timestamp()",
+    )
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "baseline schema", _baseline),
+    Migration(2, "keyset pagination indexes", _keyset_indexes),
+    Migration(3, "email outbox", _email_outbox),
+    Migration(4, "rate limit buckets", _rate_limit_buckets),
+    Migration(5, "normalize stored emails", _normalize_emails),
+    Migration(6, "post full-text search", _post_search),
+    Migration(7, "content versions", _content_versions),
+    Migration(8, "denormalized post comment counts", _post_comment_count),
+    Migration(9, "index single CJK characters for search", _search_cjk_unigrams),
+    Migration(10, "track posts whose comments changed", _comment_count_dirty_posts),
+    Migration(11, "content version bump times", _content_version_times),
+)
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table(schema_migrations.name):
+        return 0
+    return connection.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def run_migrations() -> int:
+    """Apply pending schema migrations and return how many ran."""
+    with connect_creating_database() as connection, connection.begin():
+        if _current_version(connection) >= LATEST_VERSION:
+            return 0
+
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        schema_migrations.create(connection, checkfirst=True)
+        current = _current_version(connection)
+        pending = [migration for migration in MIGRATIONS if migration.version > current]
+        for migration in pending:
+            logger.info("Applying migration %s: %s", migration.version, migration.description)
+            migration.apply(connection)
+            connection.execute(
+                schema_migrations.insert().values(version=migration.version, description=migration.description)
+            )
+        return len(pending)
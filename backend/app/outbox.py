@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import logging
+from typing import Any, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_settings
+from .database import AsyncSessionLocal, get_async_engine
+from .email_service import close_smtp_connections, send_email, senders_throttled
+from .models import EmailOutbox, EmailOutboxStatus
+from .timezone import now
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# Outlasts one send across every configured account, timeouts included.
+SEND_LEASE = timedelta(minutes=10)
+
+
+def enqueue_email(
+    db: AsyncSession,
+    *,
+    to_email: str,
+    subject: str,
+    body: str,
+    from_name: Optional[str] = None,
+) -> EmailOutbox:
+    """Add an email to the outbox; it is sent once the caller's transaction commits."""
+    message = EmailOutbox(to_email=to_email, subject=subject, body=body, from_name=from_name)
+    db.add(message)
+    return message
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+class OutboxWorker:
+    """Drains the email outbox in the background of each app process.
+
+    Each message is leased by pushing its ``next_attempt_at`` past the send
+    (claimed with ``FOR UPDATE SKIP LOCKED`` and committed at once), so several
+    processes can drain the same database without sending a message twice.
+    Its outcome is committed right after its own send; if the process dies in
+    between, the message is retried once the lease runs out.
+    """
+
+    def __init__(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="email-outbox")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await run_in_threadpool(close_smtp_connections)
+
+    def wake(self) -> None:
+        """Skip the poll interval; called after a request commits a new message."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                attempted = await self.drain_once()
+            except Exception:  # pragma: no cover - keep the worker alive across DB hiccups
+                logger.exception("Email outbox drain failed")
+                attempted = 0
+            if attempted >= settings.email_outbox_batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.email_outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> Optional[EmailOutbox]:
+        """Lease the next due message, committing at once so no lock outlives the claim."""
+        async with AsyncSessionLocal(bind=get_async_engine()) as session:
+            due = (
+                select(EmailOutbox.id)
+                .where(
+                    EmailOutbox.status == EmailOutboxStatus.PENDING,
+                    EmailOutbox.next_attempt_at <= now(),
+                )
+                .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            message = await session.scalar(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == due)
+                .values(next_attempt_at=now() + SEND_LEASE)
+                .returning(EmailOutbox)
+            )
+            await session.commit()
+            return message
+
+    async def _record(self, message: EmailOutbox, sent: bool) -> None:
+        attempts = message.attempts + 1
+        values: dict[str, Any] = {"attempts": attempts}
+        if sent:
+            values.update(status=EmailOutboxStatus.SENT, sent_at=now(), last_error=None)
+        elif attempts >= settings.email_outbox_max_attempts:
+            values.update(status=EmailOutboxStatus.FAILED, last_error="No SMTP account accepted the message")
+            logger.error("Giving up on outbox email %s after %s attempts", message.id, attempts)
+        else:
+            values.update(
+                last_error="No SMTP account accepted the message", next_attempt_at=now() + _retry_delay(attempts)
+            )
+        async with AsyncSessionLocal(bind=get_async_engine()) as session:
+            await session.execute(update(EmailOutbox).where(EmailOutbox.id == message.id).values(**values))
+            await session.commit()
+
+    async def drain_once(self) -> int:
+        """Send up to one batch of due messages and return how many were attempted."""
+        attempted = 0
+        while attempted < settings.email_outbox_batch_size:
+            if senders_throttled():
+                # Every account is cooling down or at its rate limit; leave the
+                # rest for a later pass without spending attempts.
+                break
+            message = await self._claim()
+            if message is None:
+                break
+            # No transaction is open here, so a slow SMTP server holds neither
+            # row locks nor a pooled connection.
+            sent = await run_in_threadpool(
+                send_email,
+                to_email=message.to_email,
+                subject=message.subject,
+                body=message.body,
+                from_name=message.from_name,
+            )
+            attempted += 1
+            await self._record(message, sent)
+        return attempted
+
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+import json
+import math
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import TTLCache
+from .models import Post
+
+_post_count_cache: TTLCache[int] = TTLCache(ttl_seconds=60, max_size=1024)
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str, length: int) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError(f"cursor must encode a list of {length} values")
+    return values
+
+
+def _parse_datetime(value: object) -> datetime:
+    if not isinstance(value, str):
+        raise ValueError("cursor timestamp must be a string")
+    parsed = datetime.fromisoformat(value)
+    # Keyset columns are timestamptz; a naive value would be read in the session time zone.
+    if parsed.tzinfo is None or parsed.utcoffset() is None:
+        raise ValueError("cursor timestamp must carry a UTC offset")
+    return parsed
+
+
+def _parse_uuid(value: object) -> UUID:
+    if not isinstance(value, str):
+        raise ValueError("cursor id must be a string")
+    return UUID(value)
+
+
+def _parse_rank(value: object) -> float:
+    # bool is an int subclass but never a rank.
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("cursor rank must be a finite number")
+    return float(value)
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_cursor(created_at: datetime, item_id: UUID) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+    return _encode([created_at.isoformat(), str(item_id)])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    # Cursors come from clients, so any malformed one is a 400 rather than a 500.
+    try:
+        created_raw, id_raw = _decode(cursor, 2)
+        return _parse_datetime(created_raw), _parse_uuid(id_raw)
+    except (ValueError, RecursionError):
+        raise _invalid_cursor() from None
+
+
+def encode_ranked_cursor(rank: float, created_at: datetime, item_id: UUID) -> str:
+    """Cursor for result lists ordered by a score first, e.g. search relevance."""
+    return _encode([rank, created_at.isoformat(), str(item_id)])
+
+
+def decode_ranked_cursor(cursor: str) -> tuple[float, datetime, UUID]:
+    try:
+        rank_raw, created_raw, id_raw = _decode(cursor, 3)
+        return _parse_rank(rank_raw), _parse_datetime(created_raw), _parse_uuid(id_raw)
+    except (ValueError, RecursionError):
+        raise _invalid_cursor() from None
+
+
+async def approximate_post_count(db: AsyncSession, author_id: UUID | None = None) -> int:
+    """Return a cached post count, using planner statistics for the whole table."""
+    cache_key = author_id or "all"
+    cached = _post_count_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    count: int | None = None
+    if author_id is None and db.bind.dialect.name == "postgresql":
+        estimate = (
+            await db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'posts'::regclass"))
+        ).scalar()
+        # reltuples is -1 until the table has been vacuumed or analyzed
+        if estimate is not None and estimate >= 0:
+            count = int(estimate)
+    if count is None:
+        query = select(func.count(Post.id))
+        if author_id is not None:
+            query = query.where(Post.author_id == author_id)
+        count = (await db.execute(query)).scalar() or 0
+
+    _post_count_cache.set(cache_key, count)
+    return count
@@ -0,0 +1,234 @@
+"""Opt-in sampling profiles of individual requests.
+
+A request is profiled when an admin sends ``X-Profile: 1`` (the response
+then names the artifact in ``X-Profile-Id``) or when it falls within
+``PROFILE_SAMPLE_RATE``. Everything else passes straight through: no
+sampler thread runs unless a profiled request is in flight.
+
+All requests share the event loop thread, so a sampler thread wakes every
+``PROFILE_INTERVAL_MS`` and records the profiled request's stack only. If
+its task is on the CPU, the sample is the thread's real stack, covering
+handlers, pydantic serialization and anything else called synchronously. If
+the task is suspended, the sample is the chain of awaits it is parked in,
+ending in ``<waiting>``. Waits for the database or for the password hashing
+pool therefore show up under the call that awaited them.
+
+Profiles are written in the folded-stack format (``frame;frame;frame count``)
+that flamegraph.pl, inferno and speedscope read. The file name carries the
+time, method and route. ``/admin/profiles`` lists the recent files.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+import logging
+import os
+from pathlib import Path
+import random
+import re
+import sys
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Any, Iterable, Optional
+import uuid
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .auth import user_from_token
+from .config import get_settings
+from .database import AsyncSessionLocal, get_async_engine
+from .metrics import route_name
+from .models import UserRole
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_SUFFIX = ".folded"
+# Oldest profiles beyond this many are deleted as new ones are written.
+PROFILE_RETAIN = 200
+WAITING_FRAME = "<waiting>"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+_profile_dir = Path(settings.profile_dir)
+# Longest first, so site-packages wins over the standard library directory above it.
+_roots = sorted({path + os.sep for path in sys.path if path and os.path.isdir(path)}, key=len, reverse=True)
+
+
+def _location(code: CodeType) -> str:
+    filename = code.co_filename
+    for root in _roots:
+        if filename.startswith(root):
+            filename = filename[len(root):]
+            break
+    # ";" separates frames and the last space separates the count.
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _awaited_frames(awaitable: Any) -> tuple[list[FrameType], bool]:
+    """Frames of a coroutine and everything it awaits, outermost first, and whether the innermost is running."""
+    frames = []
+    running = False
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None) or getattr(
+            awaitable, "gi_frame", None
+        )
+        if frame is None:
+            break
+        frames.append(frame)
+        running = bool(
+            getattr(awaitable, "cr_running", False)
+            or getattr(awaitable, "ag_running", False)
+            or getattr(awaitable, "gi_running", False)
+        )
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "ag_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+        )
+    return frames, running
+
+
+class Sampler:
+    """Samples one request task's stack from a background thread."""
+
+    def __init__(self, task: asyncio.Task[Any], root: FrameType) -> None:
+        self.samples: Counter[str] = Counter()
+        self._task = task
+        self._root = root
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        interval = max(settings.profile_interval_ms, 1) / 1000
+        while not self._stopped.wait(interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        current: list[FrameType] = []
+        frame = sys._current_frames().get(self._thread_id)
+        while frame is not None:
+            current.append(frame)
+            # Every request runs the middleware's code; only this frame is ours.
+            if frame is self._root:
+                self._record(reversed(current))
+                return
+            frame = frame.f_back
+        frames, running = _awaited_frames(self._task.get_coro())
+        root = next((index for index, frame in enumerate(frames) if frame is self._root), None)
+        if root is None:
+            return
+        frames = frames[root:]
+        if running:
+            # On the CPU inside a greenlet (SQLAlchemy's async bridge), whose
+            # frames do not link back to the coroutine that started it.
+            self._record([*frames, *reversed(current)])
+        else:
+            self._record(frames, WAITING_FRAME)
+
+    def _record(self, frames: Iterable[FrameType], *leaf: str) -> None:
+        self.samples[";".join([*(_location(frame.f_code) for frame in frames), *leaf])] += 1
+
+
+def _slug(route: str) -> str:
+    return re.sub(r"[^\w-]+", "_", route).strip("_") or "root"
+
+
+def _write(name: str, samples: Counter[str]) -> None:
+    _profile_dir.mkdir(parents=True, exist_ok=True)
+    lines = "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+    (_profile_dir / name).write_text(lines, encoding="utf-8")
+    profiles = sorted(_profile_dir.glob(f"*{PROFILE_SUFFIX}"), key=lambda path: path.name)
+    for stale in profiles[:-PROFILE_RETAIN]:
+        stale.unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 100) -> list[dict[str, Any]]:
+    if not _profile_dir.is_dir():
+        return []
+    # Names start with a UTC timestamp, so they sort chronologically.
+    profiles = sorted(_profile_dir.glob(f"*{PROFILE_SUFFIX}"), key=lambda path: path.name, reverse=True)[:limit]
+    return [{"name": path.name, "size": path.stat().st_size} for path in profiles]
+
+
+def profile_path(name: str) -> Optional[Path]:
+    if not PROFILE_NAME.match(name):
+        return None
+    path = _profile_dir / name
+    return path if path.is_file() else None
+
+
+async def _is_admin(scope: Scope) -> bool:
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        try:
+            user = await user_from_token(token, db)
+        except HTTPException:
+            return False
+    return user.role in (UserRole.ADMIN, UserRole.SUPERADMIN)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = any(name == PROFILE_HEADER and value == b"1" for name, value in scope["headers"])
+        if requested:
+            requested = await _is_admin(scope)
+        sampled = settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+        if not (requested or sampled):
+            await self.app(scope, receive, send)
+            return
+
+        started = datetime.now(timezone.utc)
+        name: Optional[str] = None
+
+        def profile_name() -> str:
+            nonlocal name
+            if name is None:
+                # The router has matched by the time anything is sent.
+                stamp = started.strftime("%Y%m%dT%H%M%S.%fZ")
+                name = f"{stamp}-{scope['method']}-{_slug(route_name(scope))}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+            return name
+
+        async def send_wrapper(message: Message) -> None:
+            if requested and message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_name().encode())]
+            await send(message)
+
+        sampler = Sampler(asyncio.current_task(), sys._getframe())
+        sampler.start()
+        begun = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - begun
+            if sampler.samples:
+                try:
+                    await asyncio.to_thread(_write, profile_name(), sampler.samples)
+                except OSError:
+                    logger.exception("Could not write request profile")
+                else:
+                    logger.info(
+                        "Profiled %s %s in %.0f ms: %s", scope["method"], route_name(scope), elapsed * 1000, name
+                    )
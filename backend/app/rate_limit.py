@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+import math
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .config import get_settings
+from .database import get_async_engine
+from .models import RateLimitBucket
+
+settings = get_settings()
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+MEMORY_MAX_BUCKETS = 100_000
+
+
+@dataclass(frozen=True, slots=True)
+class Rate:
+    """Token bucket holding ``capacity`` tokens, refilled evenly over ``period`` seconds."""
+
+    capacity: int
+    period: float
+
+    @property
+    def per_second(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate(value: str) -> Optional[Rate]:
+    """Parse ``"5/minute"`` style limits; an empty value disables the limit."""
+    value = value.strip()
+    if not value:
+        return None
+    count, _, unit = value.partition("/")
+    unit = unit.strip().lower().rstrip("s") or "second"
+    period = _PERIODS[unit] if unit in _PERIODS else float(unit)
+    rate = Rate(capacity=int(count), period=float(period))
+    if rate.capacity <= 0 or rate.period <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return rate
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, rate: Rate) -> float:
+        """Take one token; return 0 when allowed, else seconds until one is available."""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets; limits multiply by the number of workers."""
+
+    def __init__(self, max_buckets: int = MEMORY_MAX_BUCKETS) -> None:
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def hit(self, key: str, rate: Rate) -> float:
+        # Runs on the event loop without awaiting, so no lock is needed.
+        current = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (float(rate.capacity), current))
+        tokens = min(rate.capacity, tokens + (current - updated) * rate.per_second)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate.per_second
+        self._buckets[key] = (tokens, current)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """Buckets in an unlogged Postgres table, shared by every worker and host."""
+
+    async def hit(self, key: str, rate: Rate) -> float:
+        table = RateLimitBucket.__table__
+        current = func.now()
+        available = func.least(
+            rate.capacity,
+            table.c.tokens + func.extract("epoch", current - table.c.updated_at) * rate.per_second,
+        )
+        statement = (
+            pg_insert(table)
+            .values(key=key, tokens=rate.capacity - 1, updated_at=current)
+            .on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={"tokens": available - 1, "updated_at": current},
+                where=available >= 1,
+            )
+            .returning(table.c.tokens)
+        )
+        # A separate short transaction, so the token is spent even when the request later fails.
+        async with get_async_engine().begin() as connection:
+            if (await connection.execute(statement)).first() is not None:
+                return 0.0
+            remaining = (await connection.execute(select(available).where(table.c.key == key))).scalar() or 0.0
+        return max(0.0, (1 - float(remaining)) / rate.per_second)
+
+
+@lru_cache()
+def get_rate_limit_backend() -> RateLimitBackend:
+    backend = settings.rate_limit_backend.lower()
+    if backend == "memory":
+        return MemoryRateLimitBackend()
+    if backend == "database":
+        return DatabaseRateLimitBackend()
+    raise RuntimeError(f"Unsupported RATE_LIMIT_BACKEND: {settings.rate_limit_backend}")
+
+
+def client_ip(request: Request) -> str:
+    if settings.rate_limit_trust_forwarded:
+        # Proxies append the address they received from, so only the last
+        # RATE_LIMIT_FORWARDED_HOPS entries were written by trusted proxies;
+        # anything left of them came from the client and can be forged.
+        entries = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",")]
+        entries = [entry for entry in entries if entry]
+        if entries:
+            hops = max(settings.rate_limit_forwarded_hops, 1)
+            return entries[-hops] if len(entries) >= hops else entries[0]
+    return request.client.host if request.client else "unknown"
+
+
+def _bucket_key(scope: str, kind: str, value: str) -> str:
+    # Hashed so emails and identifiers are not stored verbatim and keys stay short.
+    digest = hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+    return f"{scope}:{kind}:{digest}"
+
+
+async def _enforce(key: str, rate: Optional[Rate]) -> None:
+    if rate is None:
+        return
+    retry_after = await get_rate_limit_backend().hit(key, rate)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class ThrottleGuard:
+    """Returned by :class:`Throttle`; limits the subject once the route knows it."""
+
+    def __init__(self, throttle: Throttle) -> None:
+        self._throttle = throttle
+
+    async def check_subject(self, subject: str) -> None:
+        await _enforce(_bucket_key(self._throttle.scope, "subject", subject), self._throttle.subject_rate)
+
+
+class Throttle:
+    """Dependency applying a per-IP token bucket to a route.
+
+    Routes that also limit by a value from the request body (an email, a login
+    identifier) call ``check_subject`` on the returned guard after parsing it.
+    """
+
+    def __init__(self, scope: str, *, ip_rate: str = "", subject_rate: str = "") -> None:
+        self.scope = scope
+        self.ip_rate = parse_rate(ip_rate)
+        self.subject_rate = parse_rate(subject_rate)
+
+    async def __call__(self, request: Request) -> ThrottleGuard:
+        await _enforce(_bucket_key(self.scope, "ip", client_ip(request)), self.ip_rate)
+        return ThrottleGuard(self)
@@ -38,6 +38,15 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class AuthorSummary(BaseModel):
+    id: UUID
+    username: str
+    role: UserRole
+
+    class Config:
+        from_attributes = True
+
+
 class RegisterRequest(BaseModel):
     email: EmailStr
     verification_code: str = Field(min_length=6, max_length=6)
@@ -56,10 +65,29 @@ class EmailCodeRequest(BaseModel):
     email: EmailStr
 
 
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    format: str
+
+
 class ImageUploadResponse(BaseModel):
     url: str
     filename: str
     size: int
+    # Generated in the background; URLs may 404 for a few seconds after upload.
+    variants: list[ImageVariant] = Field(default_factory=list)
+
+
+class PresignedUploadRequest(BaseModel):
+    content_type: str
+
+
+class PresignedUploadResponse(BaseModel):
+    url: str
+    fields: dict[str, str]
+    key: str
+    public_url: str
 
 
 class PostBase(BaseModel):
@@ -75,6 +103,8 @@ class PostCreate(PostBase):
 class PostResponse(PostBase):
     id: UUID
     author_id: UUID
+    author: AuthorSummary
+    comment_count: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -90,6 +120,7 @@ class CommentResponse(BaseModel):
     id: UUID
     post_id: UUID
     author_id: UUID
+    author: AuthorSummary
     content: str
     created_at: datetime
 
@@ -99,10 +130,85 @@ class CommentResponse(BaseModel):
 
 class PaginatedPosts(BaseModel):
     items: list[PostResponse]
-    page: int
+    page: Optional[int] = None
+    page_size: int
+    total: Optional[int] = None
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
+class PostSummary(BaseModel):
+    """A feed item: the post without its body, plus a bounded excerpt of it."""
+
+    id: UUID
+    title: str
+    excerpt: str
+    # Whether the content continues past the excerpt
+    truncated: bool
+    image_url: Optional[str] = None
+    author_id: UUID
+    author: AuthorSummary
+    comment_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+
+class PaginatedPostSummaries(PaginatedPosts):
+    items: list[PostSummary]
+
+
+class PaginatedComments(BaseModel):
+    items: list[CommentResponse]
+    page_size: int
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
+# One feed page's worth, with room for posts pushed in over /live.
+MAX_BATCH_POSTS = 50
+
+
+class PostBatchRequest(BaseModel):
+    ids: list[UUID] = Field(min_length=1, max_length=MAX_BATCH_POSTS)
+
+
+class PostBatch(BaseModel):
+    # In request order, without duplicates
+    items: list[PostResponse]
+    missing: list[UUID]
+
+
+class CommentBatchRequest(BaseModel):
+    post_ids: list[UUID] = Field(min_length=1, max_length=MAX_BATCH_POSTS)
+    per_post: int = Field(default=3, ge=1, le=20)
+
+
+class PostComments(BaseModel):
+    """The first ``per_post`` comments of a post, continued by ``GET /posts/{post_id}/comments?cursor=``."""
+
+    post_id: UUID
+    items: list[CommentResponse]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
+class CommentBatch(BaseModel):
+    items: list[PostComments]
+    missing: list[UUID]
+
+
+class PostSearchHit(PostResponse):
+    rank: float
+    # HTML-escaped, with matches wrapped in <mark>
+    title_highlight: str
+    snippet: str
+
+
+class PostSearchResults(BaseModel):
+    items: list[PostSearchHit]
     page_size: int
-    total: int
     has_more: bool
+    next_cursor: Optional[str] = None
 
 
 class AboutSectionResponse(BaseModel):
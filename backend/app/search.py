@@ -0,0 +1,119 @@
+"""Full-text search over posts.
+
+Postgres' text-search parser does not segment Chinese, so a sentence such as
+``我家兔子爱吃草`` would become a single lexeme. ``posts_search_text`` rewrites
+every CJK run into its characters interleaved with the overlapping bigrams
+(``我 我家 家 家兔 兔 兔子 ...``) before the ``simple`` configuration sees it;
+other scripts pass through as words. The same SQL function tokenizes
+documents (in the trigger) and queries, so the two can never disagree. A
+query term becomes a phrase of its tokens, which matches the term as a
+contiguous substring; the unigrams let a single character match anywhere in
+a run, including the last position, which starts no bigram.
+"""
+from __future__ import annotations
+
+import html
+import re
+from typing import Any
+
+from sqlalchemy import func
+from sqlalchemy.sql.elements import ColumnElement
+
+_CJK_CLASS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 64
+SNIPPET_LENGTH = 160
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# Installed by migration; the pattern is built from the same character ranges as _CJK_CLASS.
+SEARCH_FUNCTIONS_SQL = (
+    f"""
+    CREATE OR REPLACE FUNCTION posts_search_text(input text) RETURNS text
+    LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+    DECLARE
+        run text;
+        parts text[] := '{{}}';
+    BEGIN
+        FOR run IN
+            SELECT match[1]
+            FROM regexp_matches(lower(coalesce(input, '')), '([{_CJK_CLASS}]+|[^{_CJK_CLASS}]+)', 'g') AS match
+        LOOP
+            IF run ~ '^[{_CJK_CLASS}]' THEN
+                FOR i IN 1 .. char_length(run) LOOP
+                    parts := parts || substr(run, i, 1);
+                    IF i < char_length(run) THEN
+                        parts := parts || substr(run, i, 2);
+                    END IF;
+                END LOOP;
+            ELSE
+                parts := parts || run;
+            END IF;
+        END LOOP;
+        RETURN array_to_string(parts, ' ');
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION posts_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', posts_search_text(NEW.title)), 'A')
+            || setweight(to_tsvector('simple', posts_search_text(NEW.content)), 'B');
+        RETURN NEW;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS posts_search_vector_update ON posts",
+    """
+    CREATE TRIGGER posts_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, content ON posts
+    FOR EACH ROW EXECUTE FUNCTION posts_search_vector_update()
+    """,
+)
+# Fires the trigger for the posts whose vectors change when CJK tokenization does.
+REINDEX_CJK_POSTS_SQL = f"UPDATE posts SET title = title WHERE title ~ '[{_CJK_CLASS}]' OR content ~ '[{_CJK_CLASS}]'"
+
+
+def query_terms(query: str) -> list[str]:
+    """Split user input into at most ``MAX_QUERY_TERMS`` whitespace-separated terms."""
+    return [term[:MAX_TERM_LENGTH] for term in query.split()][:MAX_QUERY_TERMS]
+
+
+def build_tsquery(terms: list[str]) -> ColumnElement[Any]:
+    """AND together one phrase query per term."""
+    combined = None
+    for term in terms:
+        term_query = func.phraseto_tsquery("simple", func.posts_search_text(term))
+        combined = term_query if combined is None else combined.op("&&")(term_query)
+    return combined
+
+
+def highlight(text: str, terms: list[str], *, length: int | None = None) -> str:
+    """HTML-escape ``text`` and wrap every term occurrence in ``<mark>``.
+
+    With ``length`` the result is cut to a window around the first match.
+    """
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    prefix = suffix = ""
+    if length is not None and len(text) > length:
+        first = pattern.search(text) if terms else None
+        start = max(0, (first.start() if first else 0) - length // 4)
+        end = min(len(text), start + length)
+        start = max(0, end - length)
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(text) else ""
+        text = text[start:end]
+    if not terms:
+        return prefix + html.escape(text) + suffix
+
+    pieces: list[str] = []
+    position = 0
+    for match in pattern.finditer(text):
+        pieces.append(html.escape(text[position:match.start()]))
+        pieces.append(f"{HIGHLIGHT_START}{html.escape(match.group())}{HIGHLIGHT_END}")
+        position = match.end()
+    pieces.append(html.escape(text[position:]))
+    return prefix + "".join(pieces) + suffix
@@ -0,0 +1,127 @@
+"""Serialize read routes straight from result rows.
+
+Materializing ORM instances and validating each one through
+``from_attributes`` costs more than the query itself for a page of long
+posts, and FastAPI validates the returned model a second time. Read routes
+instead select only the columns a response needs, shape them into dicts and
+let a prebuilt ``TypeAdapter`` validate and dump the page to JSON bytes in a
+single pass through pydantic-core. ``python -m benchmarks.list_serialization``
+compares both paths.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Row, Select, func, select
+
+from .models import Comment, Post, User
+from .schemas import (
+    CommentBatch,
+    PaginatedComments,
+    PaginatedPostSummaries,
+    PaginatedPosts,
+    PostBatch,
+    PostResponse,
+    PostSearchResults,
+)
+
+# Long enough to fill the feed's three-line preview on wide screens.
+EXCERPT_LENGTH = 280
+
+post_adapter = TypeAdapter(PostResponse)
+posts_page_adapter = TypeAdapter(PaginatedPosts)
+post_summaries_page_adapter = TypeAdapter(PaginatedPostSummaries)
+search_results_adapter = TypeAdapter(PostSearchResults)
+comments_page_adapter = TypeAdapter(PaginatedComments)
+post_batch_adapter = TypeAdapter(PostBatch)
+comment_batch_adapter = TypeAdapter(CommentBatch)
+
+# Everything but the body, which only single-post and search responses carry.
+_POST_COLUMNS = (
+    Post.id,
+    Post.title,
+    Post.image_url,
+    Post.author_id,
+    Post.comment_count,
+    Post.created_at,
+    Post.updated_at,
+    User.username.label("author_username"),
+    User.role.label("author_role"),
+)
+_COMMENT_COLUMNS = (
+    Comment.id,
+    Comment.post_id,
+    Comment.author_id,
+    Comment.content,
+    Comment.created_at,
+    User.username.label("author_username"),
+    User.role.label("author_role"),
+)
+
+
+class JSONBytesResponse(Response):
+    """A response whose body is already encoded JSON."""
+
+    media_type = "application/json"
+
+
+def select_posts(*columns: Any) -> Select[Any]:
+    """Columns for ``post_row``, plus any extra ``columns`` the caller needs."""
+    return select(*_POST_COLUMNS, Post.content, *columns).join(User, Post.author_id == User.id)
+
+
+def select_post_summaries() -> Select[Any]:
+    """Columns for ``post_summary_row``; only the head of the content is read."""
+    # substr lets Postgres decompress just a prefix of a toasted body. The extra
+    # character tells whether anything was cut without measuring the whole text.
+    excerpt = func.substr(Post.content, 1, EXCERPT_LENGTH + 1).label("excerpt")
+    return select(*_POST_COLUMNS, excerpt).join(User, Post.author_id == User.id)
+
+
+def select_comments() -> Select[Any]:
+    return select(*_COMMENT_COLUMNS).join(User, Comment.author_id == User.id)
+
+
+def _post_fields(row: Row[Any]) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "image_url": row.image_url,
+        "author_id": row.author_id,
+        "author": {"id": row.author_id, "username": row.author_username, "role": row.author_role},
+        "comment_count": row.comment_count,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+    }
+
+
+def post_row(row: Row[Any]) -> dict[str, Any]:
+    return {**_post_fields(row), "content": row.content}
+
+
+def excerpt_fields(content: str) -> dict[str, Any]:
+    """``excerpt`` and ``truncated`` for a body, or for its first ``EXCERPT_LENGTH + 1`` characters."""
+    return {"excerpt": content[:EXCERPT_LENGTH], "truncated": len(content) > EXCERPT_LENGTH}
+
+
+def post_summary_row(row: Row[Any]) -> dict[str, Any]:
+    return {**_post_fields(row), **excerpt_fields(row.excerpt)}
+
+
+def comment_row(row: Row[Any]) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "post_id": row.post_id,
+        "author_id": row.author_id,
+        "author": {"id": row.author_id, "username": row.author_username, "role": row.author_role},
+        "content": row.content,
+        "created_at": row.created_at,
+    }
+
+
+def render(adapter: TypeAdapter[Any], value: Any, response: Response) -> JSONBytesResponse:
+    """Validate ``value`` and encode it, keeping the headers a route set on ``response``."""
+    body = adapter.dump_json(adapter.validate_python(value))
+    return JSONBytesResponse(body, headers=response.headers)
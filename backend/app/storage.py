@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+from uuid import uuid4
+
+from fastapi import Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from .config import get_settings
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# S3 rejects multipart parts below 5 MiB except for the last one.
+S3_PART_SIZE = 5 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class StoredObject:
+    key: str
+    size: int
+    created: bool
+
+
+def content_key(content_hash: str, extension: str) -> str:
+    """Shard content-addressed keys as ``<h[:2]>/<h[2:4]>/<hash><ext>``."""
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}"
+
+
+class StorageBackend(ABC):
+    """Where uploaded images and their variants live."""
+
+    @abstractmethod
+    async def save_stream(self, chunks: AsyncIterator[bytes], *, extension: str, content_type: str) -> StoredObject:
+        """Store a stream under its content hash; identical content reuses the existing object."""
+
+    @abstractmethod
+    async def read_bytes(self, key: str) -> bytes: ...
+
+    @abstractmethod
+    async def write_bytes(self, key: str, data: bytes, *, content_type: str) -> None: ...
+
+    @abstractmethod
+    def public_url(self, key: str, request: Request) -> str: ...
+
+    async def presign_upload(self, *, extension: str, content_type: str, max_size: int) -> Optional[dict[str, Any]]:
+        """Return a direct-upload form for clients, or ``None`` when unsupported."""
+        return None
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Uploads are stored under their content hash, so a URL's bytes never change."""
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code == status.HTTP_200_OK:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+class LocalStorage(StorageBackend):
+    """Files on local disk, served by the ``/uploads`` static mount."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        # Partial uploads live outside the served directory but on the same filesystem for atomic renames.
+        self.tmp_directory = directory.with_name(f"{directory.name}_tmp")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.tmp_directory.mkdir(parents=True, exist_ok=True)
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], *, extension: str, content_type: str) -> StoredObject:
+        size = 0
+        digest = hashlib.sha256()
+        temporary = self.tmp_directory / uuid4().hex
+        try:
+            with temporary.open("wb") as buffer:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    digest.update(chunk)
+                    buffer.write(chunk)
+            key = content_key(digest.hexdigest(), extension)
+            destination = self.directory / key
+            if destination.exists():
+                temporary.unlink()
+                return StoredObject(key=key, size=size, created=False)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temporary, destination)
+            return StoredObject(key=key, size=size, created=True)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+
+    async def read_bytes(self, key: str) -> bytes:
+        return await run_in_threadpool((self.directory / key).read_bytes)
+
+    async def write_bytes(self, key: str, data: bytes, *, content_type: str) -> None:
+        destination = self.directory / key
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        await run_in_threadpool(destination.write_bytes, data)
+
+    def public_url(self, key: str, request: Request) -> str:
+        return str(request.url_for("uploads", path=key))
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage (AWS S3, MinIO, R2, ...)."""
+
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        endpoint_url: Optional[str],
+        region: Optional[str],
+        access_key_id: Optional[str],
+        secret_access_key: Optional[str],
+        public_base_url: Optional[str],
+    ) -> None:
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as exc:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package") from exc
+        if not bucket:
+            raise RuntimeError("Missing required environment variable: S3_BUCKET")
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            # path-style addressing keeps MinIO and other self-hosted stand-ins working
+            config=Config(s3={"addressing_style": "path"}),
+        )
+        base = public_base_url or f"{(endpoint_url or 'https://s3.amazonaws.com').rstrip('/')}/{bucket}"
+        self.public_base_url = base.rstrip("/")
+
+    async def _call(self, method: str, **kwargs: Any) -> Any:
+        return await run_in_threadpool(getattr(self.client, method), **kwargs)
+
+    async def _exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await self._call("head_object", Bucket=self.bucket, Key=key)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in {"404", "NoSuchKey", "NotFound"}:
+                return False
+            raise
+        return True
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], *, extension: str, content_type: str) -> StoredObject:
+        # The key depends on the hash, which is only known at the end, so the
+        # stream goes to a temporary key first and is then copied server-side.
+        temporary = f"tmp/{uuid4().hex}"
+        upload = await self._call(
+            "create_multipart_upload", Bucket=self.bucket, Key=temporary, ContentType=content_type
+        )
+        upload_id = upload["UploadId"]
+        parts: list[dict[str, Any]] = []
+        size = 0
+        digest = hashlib.sha256()
+        buffer = bytearray()
+
+        async def flush() -> None:
+            part = await self._call(
+                "upload_part",
+                Bucket=self.bucket,
+                Key=temporary,
+                UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                Body=bytes(buffer),
+            )
+            parts.append({"PartNumber": len(parts) + 1, "ETag": part["ETag"]})
+            buffer.clear()
+
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                digest.update(chunk)
+                buffer.extend(chunk)
+                if len(buffer) >= S3_PART_SIZE:
+                    await flush()
+            if buffer or not parts:
+                await flush()
+            await self._call(
+                "complete_multipart_upload",
+                Bucket=self.bucket,
+                Key=temporary,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            await self._call("abort_multipart_upload", Bucket=self.bucket, Key=temporary, UploadId=upload_id)
+            raise
+
+        key = content_key(digest.hexdigest(), extension)
+        try:
+            created = not await self._exists(key)
+            if created:
+                await self._call(
+                    "copy_object",
+                    Bucket=self.bucket,
+                    Key=key,
+                    CopySource={"Bucket": self.bucket, "Key": temporary},
+                    ContentType=content_type,
+                    CacheControl=IMMUTABLE_CACHE_CONTROL,
+                    MetadataDirective="REPLACE",
+                )
+        finally:
+            await self._call("delete_object", Bucket=self.bucket, Key=temporary)
+        return StoredObject(key=key, size=size, created=created)
+
+    async def read_bytes(self, key: str) -> bytes:
+        response = await self._call("get_object", Bucket=self.bucket, Key=key)
+        return await run_in_threadpool(response["Body"].read)
+
+    async def write_bytes(self, key: str, data: bytes, *, content_type: str) -> None:
+        await self._call(
+            "put_object",
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL,
+        )
+
+    def public_url(self, key: str, request: Request) -> str:
+        return f"{self.public_base_url}/{key}"
+
+    async def presign_upload(self, *, extension: str, content_type: str, max_size: int) -> Optional[dict[str, Any]]:
+        key = f"direct/{uuid4().hex}{extension}"
+        form = await self._call(
+            "generate_presigned_post",
+            Bucket=self.bucket,
+            Key=key,
+            Fields={"Content-Type": content_type, "Cache-Control": IMMUTABLE_CACHE_CONTROL},
+            Conditions=[
+                {"Content-Type": content_type},
+                {"Cache-Control": IMMUTABLE_CACHE_CONTROL},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=600,
+        )
+        return {"url": form["url"], "fields": form["fields"], "key": key, "public_url": f"{self.public_base_url}/{key}"}
+
+
+@lru_cache()
+def get_storage() -> StorageBackend:
+    settings = get_settings()
+    backend = settings.storage_backend.lower()
+    if backend == "local":
+        return LocalStorage(Path(settings.upload_dir))
+    if backend == "s3":
+        return S3Storage(
+            bucket=settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            public_base_url=settings.s3_public_base_url,
+        )
+    raise RuntimeError(f"Unsupported STORAGE_BACKEND: {settings.storage_backend}")
@@ -0,0 +1,149 @@
+"""Compare page-number and keyset pagination of ``GET /posts`` on a large table.
+
+Run from ``backend/`` against a disposable PostgreSQL database::
+
+    python -m benchmarks.list_posts_pagination --posts 1000000
+
+Seeded rows are tagged so ``--cleanup`` can remove them afterwards.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import select, text
+
+from app.database import AsyncSessionLocal, dispose_engines, get_async_engine, session_scope
+from app.initialization import run_initialization
+from app.models import Post, User, UserRole
+from app.pagination import encode_cursor
+from main import list_posts
+
+BENCH_USERNAME = "bench-author"
+BENCH_TITLE_PREFIX = "[bench] "
+# The default listing first, then full bodies for comparison.
+VIEWS = ("summary", "full")
+# No conditional headers, so every call renders a full page.
+_REQUEST = Request({"type": "http", "method": "GET", "path": "/posts", "headers": []})
+
+
+def _seed(total_posts: int) -> None:
+    with session_scope() as session:
+        author = session.execute(select(User).where(User.username == BENCH_USERNAME)).scalar_one_or_none()
+        if author is None:
+            author = User(
+                username=BENCH_USERNAME,
+                email="bench-author@example.com",
+                hashed_password="!",
+                role=UserRole.USER,
+            )
+            session.add(author)
+            session.flush()
+        existing = session.execute(
+            text("SELECT count(*) FROM posts WHERE title LIKE :prefix"),
+            {"prefix": f"{BENCH_TITLE_PREFIX}%"},
+        ).scalar()
+        missing = total_posts - existing
+        if missing > 0:
+            print(f"seeding {missing} posts...")
+            session.execute(
+                text(
+                    "INSERT INTO posts (id, title, content, author_id, created_at, updated_at) "
+                    "SELECT gen_random_uuid(), :prefix || g, repeat('兔兔 rabbit ', 40), :author_id, "
+                    "now() - g * interval '1 second', now() - g * interval '1 second' "
+                    "FROM generate_series(CAST(:start AS bigint), CAST(:stop AS bigint)) AS g"
+                ),
+                {"prefix": BENCH_TITLE_PREFIX, "author_id": author.id, "start": existing + 1, "stop": total_posts},
+            )
+    with session_scope() as session:
+        session.execute(text("ANALYZE posts"))
+
+
+def _cleanup() -> None:
+    with session_scope() as session:
+        session.execute(text("DELETE FROM posts WHERE title LIKE :prefix"), {"prefix": f"{BENCH_TITLE_PREFIX}%"})
+        session.execute(text("DELETE FROM users WHERE username = :name"), {"name": BENCH_USERNAME})
+
+
+async def _time(call, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def _compare(pages: list[int], page_size: int, repeats: int) -> None:
+    print(f"{'view':>8} {'page':>8} {'offset ms':>12} {'cursor ms':>12}")
+    async with AsyncSessionLocal(bind=get_async_engine()) as session:
+        for page in pages:
+            cursor = ""
+            if page > 1:
+                anchor = (
+                    await session.execute(
+                        select(Post.created_at, Post.id)
+                        .order_by(Post.created_at.desc(), Post.id.desc())
+                        .offset((page - 1) * page_size - 1)
+                        .limit(1)
+                    )
+                ).one()
+                cursor = encode_cursor(anchor.created_at, anchor.id)
+
+            # Called directly, so every Query() default must be passed explicitly.
+            for view in VIEWS:
+                offset_ms = await _time(
+                    lambda: list_posts(
+                        request=_REQUEST,
+                        response=Response(),
+                        page=page,
+                        page_size=page_size,
+                        author_id=None,
+                        cursor=None,
+                        include_total=False,
+                        view=view,
+                        db=session,
+                    ),
+                    repeats,
+                )
+                cursor_ms = await _time(
+                    lambda: list_posts(
+                        request=_REQUEST,
+                        response=Response(),
+                        page=1,
+                        page_size=page_size,
+                        author_id=None,
+                        cursor=cursor,
+                        include_total=False,
+                        view=view,
+                        db=session,
+                    ),
+                    repeats,
+                )
+                print(f"{view:>8} {page:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 5000])
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--cleanup", action="store_true", help="remove seeded rows and exit")
+    args = parser.parse_args()
+
+    run_initialization()
+    if args.cleanup:
+        _cleanup()
+        return
+    _seed(args.posts)
+
+    asyncio.run(_compare(args.pages, args.page_size, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
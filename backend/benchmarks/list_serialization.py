@@ -0,0 +1,148 @@
+"""Compare ORM-based and row-based serialization of a ``GET /posts`` page.
+
+Run from ``backend/`` against a migrated database that has at least one page
+of posts (``benchmarks.list_posts_pagination`` seeds plenty)::
+
+    python -m benchmarks.list_serialization --content-length 4000
+
+The ``orm`` path is what list routes did before ``app.serialization``: load
+``Post`` instances with their authors, wrap them in ``PaginatedPosts`` through
+``from_attributes``, then let FastAPI validate and dump the model. The ``rows``
+path selects plain columns and renders them with a prebuilt ``TypeAdapter``.
+Both the serialization step alone (on in-memory data with ``--content-length``
+characters per post) and the full fetch plus serialization are timed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import statistics
+import time
+import uuid
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.database import AsyncSessionLocal, dispose_engines, get_async_engine
+from app.models import Post, User, UserRole
+from app.schemas import PaginatedPosts
+from app.serialization import post_row, posts_page_adapter, render, select_posts
+
+# FastAPI keeps one of these per route to revalidate and dump the returned model.
+_response_field_adapter = TypeAdapter(PaginatedPosts)
+
+
+def _orm_page(posts: list[Post]) -> bytes:
+    page = PaginatedPosts(items=posts, page_size=len(posts), has_more=True, next_cursor="cursor")
+    return _response_field_adapter.dump_json(_response_field_adapter.validate_python(page))
+
+
+def _rows_page(items: list[dict]) -> bytes:
+    page = {"items": items, "page_size": len(items), "has_more": True, "next_cursor": "cursor"}
+    return render(posts_page_adapter, page, Response()).body
+
+
+def _median_us(call, repeats: int, number: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        samples.append((time.perf_counter() - started) / number)
+    return statistics.median(samples) * 1_000_000
+
+
+async def _median_async_us(call, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1_000_000
+
+
+def _in_memory(page_size: int, content_length: int, repeats: int) -> None:
+    timestamp = datetime.now(timezone.utc)
+    author = User(
+        id=uuid.uuid4(),
+        username="bench-author",
+        email="bench@example.com",
+        hashed_password="!",
+        role=UserRole.USER,
+    )
+    posts = [
+        Post(
+            id=uuid.uuid4(),
+            title=f"post {index}",
+            content=("兔兔 rabbit " * content_length)[:content_length],
+            author_id=author.id,
+            author=author,
+            comment_count=index,
+            created_at=timestamp,
+            updated_at=timestamp,
+        )
+        for index in range(page_size)
+    ]
+    rows = [
+        {
+            "id": post.id,
+            "title": post.title,
+            "content": post.content,
+            "image_url": None,
+            "author_id": author.id,
+            "author": {"id": author.id, "username": author.username, "role": author.role},
+            "comment_count": post.comment_count,
+            "created_at": post.created_at,
+            "updated_at": post.updated_at,
+        }
+        for post in posts
+    ]
+    assert _orm_page(posts) == _rows_page(rows), "both paths must produce the same body"
+    orm_us = _median_us(lambda: _orm_page(posts), repeats, 200)
+    rows_us = _median_us(lambda: _rows_page(rows), repeats, 200)
+    print(f"serialize only   orm {orm_us:>9.1f} us   rows {rows_us:>9.1f} us   speedup {orm_us / rows_us:.2f}x")
+
+
+async def _database(page_size: int, repeats: int) -> None:
+    async with AsyncSessionLocal(bind=get_async_engine()) as session:
+        orm_query = (
+            select(Post)
+            .options(joinedload(Post.author, innerjoin=True))
+            .order_by(Post.created_at.desc(), Post.id.desc())
+            .limit(page_size)
+        )
+        rows_query = select_posts().order_by(Post.created_at.desc(), Post.id.desc()).limit(page_size)
+
+        async def orm() -> bytes:
+            session.expunge_all()  # a request starts with an empty identity map
+            return _orm_page((await session.scalars(orm_query)).all())
+
+        async def rows() -> bytes:
+            return _rows_page([post_row(row) for row in await session.execute(rows_query)])
+
+        if await orm() != await rows():
+            raise SystemExit("ORM and row paths disagree; is the database migrated?")
+        orm_us = await _median_async_us(orm, repeats)
+        rows_us = await _median_async_us(rows, repeats)
+    await dispose_engines()
+    print(f"fetch+serialize  orm {orm_us:>9.1f} us   rows {rows_us:>9.1f} us   speedup {orm_us / rows_us:.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--content-length", type=int, default=4000, help="characters per post for the in-memory run")
+    parser.add_argument("--repeats", type=int, default=25)
+    parser.add_argument("--skip-database", action="store_true", help="only time the in-memory serialization")
+    args = parser.parse_args()
+
+    _in_memory(args.page_size, args.content_length, args.repeats)
+    if not args.skip_database:
+        asyncio.run(_database(args.page_size, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
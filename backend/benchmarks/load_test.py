@@ -0,0 +1,391 @@
+"""Load-test the main read and write routes and record latency per route.
+
+Run from ``backend/`` after seeding (``python -m benchmarks.seed``)::
+
+    python -m benchmarks.load_test --duration 20 --concurrency 32 --output before.json
+    python -m benchmarks.load_test --duration 20 --concurrency 32 --compare before.json
+
+Without ``--base-url`` the script starts its own ``uvicorn`` on a free port
+with login throttling off and uploads going to a temporary directory, so the
+numbers measure the app rather than the rate limiter. Against an external
+server, lift ``RATE_LIMIT_LOGIN_*`` there first or ``login`` reports 429s.
+
+Routes run one after another, each for ``--duration`` seconds with
+``--concurrency`` clients, so one route's slowness does not leak into
+another's numbers. Every route reports requests, errors (non-2xx), throughput
+and p50/p95/p99 latency. ``--output`` writes them as JSON together with the
+commit and parameters; ``--compare`` checks a run against such a file and
+exits non-zero when a route's p95 latency rose, or its throughput fell, by
+more than ``--threshold`` percent.
+
+Needs ``httpx`` (``pip install httpx``), which the app itself does not.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import io
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+from PIL import Image
+from sqlalchemy import text
+
+from app.database import get_engine
+from benchmarks.seed import BENCH_PASSWORD, BENCH_USER_PREFIX, bench_username
+
+ROUTES = (
+    "list_posts",
+    "list_posts_offset",
+    "get_post",
+    "get_comments",
+    "batch_get_posts",
+    "batch_get_comments",
+    "search",
+    "login",
+    "upload_image",
+)
+SEARCH_TERMS = ("rabbit", "carrots", "hay", "兔兔", "胡萝卜", "草地")
+HOT_POSTS = 100
+SAMPLE_POSTS = 5_000
+
+
+@dataclass
+class Dataset:
+    users: int
+    post_ids: list[str]
+    hot_post_ids: list[str]
+    total_posts: int
+
+
+@dataclass
+class RouteResult:
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def record(self, started: float, response: httpx.Response) -> None:
+        self.latencies.append(time.perf_counter() - started)
+        key = str(response.status_code)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if not response.is_success:
+            self.errors += 1
+
+    def summary(self) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        if count >= 2:
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0.0
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "throughput_rps": round(count / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": round(p50 * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "p99_ms": round(p99 * 1000, 2),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "statuses": self.statuses,
+        }
+
+
+def _load_dataset(rng: random.Random) -> Dataset:
+    with get_engine().connect() as connection:
+        users = connection.execute(
+            text("SELECT count(*) FROM users WHERE username LIKE :prefix"), {"prefix": f"{BENCH_USER_PREFIX}%"}
+        ).scalar()
+        # reltuples avoids counting millions of rows; it is only reported.
+        total_posts = connection.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'posts'")).scalar()
+        hot = connection.execute(
+            text("SELECT id FROM posts ORDER BY comment_count DESC LIMIT :limit"), {"limit": HOT_POSTS}
+        ).scalars()
+        # Ids are random UUIDs, so the first ones in index order are a cheap uniform sample.
+        sample = connection.execute(text("SELECT id FROM posts ORDER BY id LIMIT :limit"), {"limit": SAMPLE_POSTS}).scalars()
+        hot_post_ids = [str(post_id) for post_id in hot]
+        post_ids = [str(post_id) for post_id in sample]
+    if not users or not post_ids:
+        raise SystemExit("No bench users or posts; run `python -m benchmarks.seed` first.")
+    rng.shuffle(post_ids)
+    return Dataset(users=users, post_ids=post_ids, hot_post_ids=hot_post_ids, total_posts=max(total_posts or 0, 0))
+
+
+def _images(count: int, rng: random.Random) -> list[bytes]:
+    """Distinct PNGs; once the pool wraps around, uploads hit the dedupe path."""
+    images = []
+    for _ in range(count):
+        image = Image.effect_noise((1024, 768), rng.uniform(20, 80)).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+class Scenario:
+    """Builds one request per call for each route from the seeded dataset."""
+
+    def __init__(self, dataset: Dataset, images: list[bytes], tokens: list[str], seed: int) -> None:
+        self.dataset = dataset
+        self.images = images
+        self.tokens = tokens
+        self.rng = random.Random(seed)
+        self._cursors: list[str] = []
+        self._upload_index = 0
+
+    async def list_posts(self, client: httpx.AsyncClient) -> httpx.Response:
+        # Mostly the first page, sometimes a later one reached through a cursor seen earlier.
+        cursor = self.rng.choice(self._cursors) if self._cursors and self.rng.random() < 0.3 else ""
+        response = await client.get("/posts", params={"cursor": cursor})
+        if response.is_success and len(self._cursors) < 1_000:
+            next_cursor = response.json().get("next_cursor")
+            if next_cursor:
+                self._cursors.append(next_cursor)
+        return response
+
+    async def list_posts_offset(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/posts", params={"page": self.rng.randint(1, 50)})
+
+    async def get_post(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/posts/{self.rng.choice(self.dataset.post_ids)}")
+
+    async def get_comments(self, client: httpx.AsyncClient) -> httpx.Response:
+        # Readers gather where the discussion is.
+        pool = self.dataset.hot_post_ids if self.rng.random() < 0.8 else self.dataset.post_ids
+        return await client.get(f"/posts/{self.rng.choice(pool)}/comments")
+
+    async def batch_get_posts(self, client: httpx.AsyncClient) -> httpx.Response:
+        # What a feed page of 20 posts would otherwise fetch one by one.
+        return await client.post("/posts/batch-get", json={"ids": self.rng.sample(self.dataset.post_ids, 20)})
+
+    async def batch_get_comments(self, client: httpx.AsyncClient) -> httpx.Response:
+        post_ids = self.rng.sample(self.dataset.hot_post_ids, 5) + self.rng.sample(self.dataset.post_ids, 15)
+        return await client.post("/posts/comments/batch-get", json={"post_ids": post_ids})
+
+    async def search(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/posts/search", params={"q": self.rng.choice(SEARCH_TERMS)})
+
+    async def login(self, client: httpx.AsyncClient) -> httpx.Response:
+        username = bench_username(self.rng.randint(1, self.dataset.users))
+        return await client.post("/auth/login", json={"identifier": username, "password": BENCH_PASSWORD})
+
+    async def upload_image(self, client: httpx.AsyncClient) -> httpx.Response:
+        self._upload_index += 1
+        image = self.images[self._upload_index % len(self.images)]
+        token = self.tokens[self._upload_index % len(self.tokens)]
+        return await client.post(
+            "/api/uploads/images",
+            files={"file": ("bench.png", image, "image/png")},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+
+async def _run_route(
+    client: httpx.AsyncClient,
+    call: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]],
+    duration: float,
+    concurrency: int,
+) -> RouteResult:
+    result = RouteResult()
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await call(client)
+            except httpx.HTTPError:
+                result.latencies.append(time.perf_counter() - started)
+                result.statuses["transport_error"] = result.statuses.get("transport_error", 0) + 1
+                result.errors += 1
+                continue
+            result.record(started, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def _tokens(client: httpx.AsyncClient, users: int, count: int) -> list[str]:
+    tokens = []
+    for index in range(1, min(users, count) + 1):
+        response = await client.post(
+            "/auth/login", json={"identifier": bench_username(index), "password": BENCH_PASSWORD}
+        )
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+
+async def _load_test(base_url: str, args: argparse.Namespace, dataset: Dataset) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    routes = args.routes or list(ROUTES)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        tokens = await _tokens(client, dataset.users, 8) if "upload_image" in routes else []
+        images = _images(args.images, rng) if "upload_image" in routes else []
+        scenario = Scenario(dataset, images, tokens, args.seed)
+        results = {}
+        for route in routes:
+            call = getattr(scenario, route)
+            if args.warmup:
+                await _run_route(client, call, args.warmup, args.concurrency)
+            summary = (await _run_route(client, call, args.duration, args.concurrency)).summary()
+            results[route] = summary
+            print(
+                f"{route:<18} {summary['requests']:>7} req  {summary['throughput_rps']:>8.1f} req/s  "
+                f"p50 {summary['p50_ms']:>7.1f}  p95 {summary['p95_ms']:>7.1f}  p99 {summary['p99_ms']:>7.1f} ms  "
+                f"errors {summary['errors']}"
+            )
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _spawn_server(workers: int, upload_dir: str) -> tuple[subprocess.Popen[bytes], str]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "RATE_LIMIT_LOGIN_IP": "",
+        "RATE_LIMIT_LOGIN_IDENTIFIER": "",
+        "STORAGE_BACKEND": "local",
+        "UPLOAD_DIR": upload_dir,
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        env=env,
+        # Its own process group, so the password and image pools go down with it.
+        start_new_session=True,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with status {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).is_success:
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("Server did not become healthy within 60s")
+
+
+def _stop_server(server: subprocess.Popen[bytes]) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        # Still encoding variants for the uploads; those results are not needed.
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Routes whose p95 rose or throughput fell by more than ``threshold`` percent."""
+    regressions = []
+    limit = threshold / 100
+    for route, now in current["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + limit):
+            regressions.append(f"{route}: p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms")
+        if before["throughput_rps"] and now["throughput_rps"] < before["throughput_rps"] * (1 - limit):
+            regressions.append(
+                f"{route}: throughput {before['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} req/s"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="test a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned server")
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, help="default: all of them")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per route")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--images", type=int, default=32, help="distinct images in the upload pool")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression, in percent")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    dataset = _load_dataset(random.Random(args.seed))
+    server = None
+    with tempfile.TemporaryDirectory(prefix="ituhouse-bench-") as upload_dir:
+        if args.base_url:
+            base_url = args.base_url.rstrip("/")
+        else:
+            server, base_url = _spawn_server(args.workers, upload_dir)
+        try:
+            routes = asyncio.run(_load_test(base_url, args, dataset))
+        finally:
+            if server is not None:
+                _stop_server(server)
+
+    results = {
+        "meta": {
+            "started_at": started_at,
+            "commit": _git_commit(),
+            "base_url": args.base_url,
+            "workers": None if args.base_url else args.workers,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "bench_users": dataset.users,
+            "posts_estimate": dataset.total_posts,
+        },
+        "routes": routes,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+            handle.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
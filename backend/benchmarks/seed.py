@@ -0,0 +1,221 @@
+"""Generate a reproducible synthetic dataset for the load tests.
+
+Run from ``backend/`` against a disposable PostgreSQL database::
+
+    python -m benchmarks.seed --users 1000 --posts 2000000 --comments 5000000 --seed 42
+    python -m benchmarks.seed --cleanup
+
+Users are ``bench-user-<n>`` and all share ``BENCH_PASSWORD``. Authorship is
+skewed so a few users write most posts, post bodies range from a line to a
+few thousand characters of mixed Chinese and Latin text, and comments pile up
+on a small set of recent posts the way real discussion does. Each batch
+reseeds Postgres' ``random()`` from ``--seed`` and the batch number, so the
+same arguments always give the same distribution, and an interrupted run
+resumes where it stopped. Every seeded row belongs to a bench user, which is
+how ``--cleanup`` finds them.
+
+Inserting posts fires the full-text search trigger, so millions of posts take
+a while; the counts are progress-reported per batch.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Connection
+
+from app.database import get_engine, session_scope
+from app.hashing import hash_password
+from app.initialization import run_initialization
+from app.maintenance import COMMENT_COUNT_REPAIR_SQL
+from app.models import User, UserRole
+
+BENCH_USER_PREFIX = "bench-user-"
+BENCH_PASSWORD = "bench-password"
+BATCH_SIZE = 50_000
+# Exponents for random() ** k: larger means a few authors / posts take more of the rows.
+AUTHOR_SKEW = 3
+COMMENT_SKEW = 4
+
+
+def bench_username(index: int) -> str:
+    return f"{BENCH_USER_PREFIX}{index}"
+
+
+def _count(connection: Connection, query: str) -> int:
+    return connection.execute(text(query), {"prefix": f"{BENCH_USER_PREFIX}%"}).scalar() or 0
+
+
+def _seed_users(total: int) -> None:
+    with session_scope() as session:
+        existing = session.execute(
+            text("SELECT count(*) FROM users WHERE username LIKE :prefix"), {"prefix": f"{BENCH_USER_PREFIX}%"}
+        ).scalar()
+        if existing >= total:
+            return
+        # One hash for everybody: bcrypt is deliberately slow.
+        hashed = asyncio.run(hash_password(BENCH_PASSWORD))
+        session.execute(
+            insert(User),
+            [
+                {
+                    "username": bench_username(index),
+                    "email": f"{bench_username(index)}@example.com",
+                    "hashed_password": hashed,
+                    "role": UserRole.USER,
+                    "email_verified": True,
+                }
+                for index in range(existing + 1, total + 1)
+            ],
+        )
+    print(f"users: {total}")
+
+
+def _load_numbered(connection: Connection, table: str, query: str) -> int:
+    connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    connection.execute(text(f"CREATE TEMP TABLE {table} AS {query}"), {"prefix": f"{BENCH_USER_PREFIX}%"})
+    connection.execute(text(f"CREATE UNIQUE INDEX ON {table} (n)"))
+    return connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def _reseed(connection: Connection, seed: int, stream: int, batch: int) -> None:
+    value = ((seed * 1_000_003 + stream * 7_919 + batch) % 2_000_000) / 1_000_000 - 1
+    connection.execute(text("SELECT setseed(:value)"), {"value": value})
+
+
+def _seed_posts(connection: Connection, total: int, seed: int) -> None:
+    authors = _load_numbered(
+        connection,
+        "bench_authors",
+        "SELECT row_number() OVER (ORDER BY username) AS n, id FROM users WHERE username LIKE :prefix",
+    )
+    existing = _count(
+        connection,
+        "SELECT count(*) FROM posts JOIN users ON users.id = posts.author_id WHERE users.username LIKE :prefix",
+    )
+    for start in range(existing, total, BATCH_SIZE):
+        stop = min(start + BATCH_SIZE, total)
+        started = time.perf_counter()
+        _reseed(connection, seed, 1, start // BATCH_SIZE)
+        connection.execute(
+            text(
+                """
+                INSERT INTO posts (id, title, content, author_id, comment_count, created_at, updated_at)
+                SELECT gen_random_uuid(), 'bench post ' || g, body, bench_authors.id, 0, created_at, created_at
+                FROM (
+                    SELECT
+                        g,
+                        1 + floor(:authors * random() ^ CAST(:skew AS float8))::int AS author_n,
+                        left(repeat('兔兔在草地上吃胡萝卜。The rabbit eats hay and carrots. ', 80),
+                             20 + floor(random() ^ 2 * 3500)::int) AS body,
+                        now() - random() * interval '365 days' AS created_at
+                    FROM generate_series(CAST(:start AS bigint) + 1, CAST(:stop AS bigint)) AS g
+                ) AS generated
+                JOIN bench_authors ON bench_authors.n = generated.author_n
+                """
+            ),
+            {"authors": authors, "skew": AUTHOR_SKEW, "start": start, "stop": stop},
+        )
+        connection.commit()
+        print(f"posts: {stop}/{total} ({time.perf_counter() - started:.1f}s)")
+
+
+def _seed_comments(connection: Connection, total: int, seed: int) -> None:
+    authors = _load_numbered(
+        connection,
+        "bench_authors",
+        "SELECT row_number() OVER (ORDER BY username) AS n, id FROM users WHERE username LIKE :prefix",
+    )
+    # Newest first, so the skew lands on recent posts.
+    posts = _load_numbered(
+        connection,
+        "bench_posts",
+        """
+        SELECT row_number() OVER (ORDER BY posts.created_at DESC, posts.id) AS n, posts.id, posts.created_at
+        FROM posts JOIN users ON users.id = posts.author_id WHERE users.username LIKE :prefix
+        """,
+    )
+    if not posts:
+        return
+    existing = _count(
+        connection,
+        "SELECT count(*) FROM comments JOIN users ON users.id = comments.author_id WHERE users.username LIKE :prefix",
+    )
+    for start in range(existing, total, BATCH_SIZE):
+        stop = min(start + BATCH_SIZE, total)
+        started = time.perf_counter()
+        _reseed(connection, seed, 2, start // BATCH_SIZE)
+        connection.execute(
+            text(
+                """
+                INSERT INTO comments (id, content, author_id, post_id, created_at)
+                SELECT gen_random_uuid(), 'bench comment ' || g, bench_authors.id, bench_posts.id,
+                       least(now(), bench_posts.created_at + random() * interval '30 days')
+                FROM (
+                    SELECT
+                        g,
+                        1 + floor(:authors * random())::int AS author_n,
+                        1 + floor(:posts * random() ^ CAST(:skew AS float8))::int AS post_n
+                    FROM generate_series(CAST(:start AS bigint) + 1, CAST(:stop AS bigint)) AS g
+                ) AS generated
+                JOIN bench_authors ON bench_authors.n = generated.author_n
+                JOIN bench_posts ON bench_posts.n = generated.post_n
+                """
+            ),
+            {"authors": authors, "posts": posts, "skew": COMMENT_SKEW, "start": start, "stop": stop},
+        )
+        connection.commit()
+        print(f"comments: {stop}/{total} ({time.perf_counter() - started:.1f}s)")
+    for statement in COMMENT_COUNT_REPAIR_SQL:
+        connection.execute(text(statement))
+    connection.commit()
+
+
+def seed(users: int, posts: int, comments: int, seed_value: int) -> None:
+    run_initialization()
+    _seed_users(users)
+    with get_engine().connect() as connection:
+        # Parallel workers would each draw from their own random() stream.
+        connection.execute(text("SET max_parallel_workers_per_gather = 0"))
+        _seed_posts(connection, posts, seed_value)
+        _seed_comments(connection, comments, seed_value)
+        connection.execute(text("ANALYZE users, posts, comments"))
+        connection.commit()
+
+
+def cleanup() -> None:
+    prefix = {"prefix": f"{BENCH_USER_PREFIX}%"}
+    with session_scope() as session:
+        bench_users = "SELECT id FROM users WHERE username LIKE :prefix"
+        session.execute(
+            text(
+                f"DELETE FROM comments WHERE author_id IN ({bench_users}) "
+                f"OR post_id IN (SELECT id FROM posts WHERE author_id IN ({bench_users}))"
+            ),
+            prefix,
+        )
+        session.execute(text(f"DELETE FROM posts WHERE author_id IN ({bench_users})"), prefix)
+        session.execute(text("DELETE FROM users WHERE username LIKE :prefix"), prefix)
+        for statement in COMMENT_COUNT_REPAIR_SQL:
+            session.execute(text(statement))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--comments", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cleanup", action="store_true", help="remove all seeded rows and exit")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+    seed(args.users, args.posts, args.comments, args.seed)
+
+
+if __name__ == "__main__":
+    main()
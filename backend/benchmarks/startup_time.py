@@ -0,0 +1,57 @@
+"""Check that importing the app and running startup initialization stays within budget.
+
+Run from ``backend/`` against an already-migrated database::
+
+    python -m benchmarks.startup_time --budget 1.5
+
+Each sample runs in a fresh interpreter so import costs are included. The
+script exits non-zero when the median exceeds the budget, which makes it
+usable as a CI gate.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.run_initialization()
+finished = time.perf_counter()
+print(json.dumps({"import": imported - started, "initialize": finished - imported}))
+"""
+
+
+def _sample() -> dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds allowed for import + initialization")
+    args = parser.parse_args()
+
+    _sample()  # warm-up: applies pending migrations and syncs the super admin
+    samples = [_sample() for _ in range(args.runs)]
+    imports = statistics.median(sample["import"] for sample in samples)
+    initializations = statistics.median(sample["initialize"] for sample in samples)
+    total = imports + initializations
+    print(f"import {imports:.3f}s  initialize {initializations:.3f}s  total {total:.3f}s  budget {args.budget:.3f}s")
+    if total > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
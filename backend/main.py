@@ -3,34 +3,89 @@ from __future__ import annotations
 import secrets
 import string
 from datetime import timedelta
-from pathlib import Path
+from typing import Any, AsyncIterator, Literal
 from uuid import UUID, uuid4
 
-from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, UploadFile, status
+from fastapi import BackgroundTasks, Depends, FastAPI, File, HTTPException, Query, Request, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-
-from app.auth import create_access_token, get_current_user, get_password_hash, require_roles, verify_password
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy import cast, func, literal, select, true, tuple_, update
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.about import ABOUT_SECTIONS, about_snapshot, bump_version
+from app.auth import (
+    create_access_token,
+    get_current_user,
+    invalidate_cached_user,
+    normalize_email,
+    publish_user_changed,
+    require_roles,
+    user_cache,
+)
 from app.config import get_settings
-from app.database import get_db
+from app.database import dispose_engines, get_db, get_read_db
 from app.initialization import run_initialization
-from app.email_service import send_verification_email
+from app.email_service import build_verification_email, has_sender_configs, sender_stats
+from app.hashing import hash_password, shutdown_password_pool, verify_and_update_password
+from app.http_cache import CACHE_ABOUT, CACHE_POST, CACHE_REVALIDATE, conditional_response, make_etag
+from app.images import generate_variants, planned_variants, shutdown_image_pool
+from app.live import live_broker, publish_comment_created, publish_post_created
+from app.maintenance import maintenance_worker
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
 from app.models import AboutSection, Comment, EmailVerificationCode, Post, User, UserRole
+from app.outbox import enqueue_email, outbox_worker
+from app.pagination import (
+    approximate_post_count,
+    decode_cursor,
+    decode_ranked_cursor,
+    encode_cursor,
+    encode_ranked_cursor,
+)
+from app.profiling import ProfilingMiddleware, list_profiles, profile_path
+from app.rate_limit import Throttle, ThrottleGuard
+from app.search import SNIPPET_LENGTH, build_tsquery, highlight, query_terms
+from app.serialization import (
+    JSONBytesResponse,
+    comment_batch_adapter,
+    comment_row,
+    comments_page_adapter,
+    post_adapter,
+    post_batch_adapter,
+    post_row,
+    post_summaries_page_adapter,
+    post_summary_row,
+    posts_page_adapter,
+    render,
+    search_results_adapter,
+    select_comments,
+    select_post_summaries,
+    select_posts,
+)
+from app.storage import ImmutableStaticFiles, LocalStorage, StoredObject, get_storage
 from app.schemas import (
     AboutSectionResponse,
     AboutSectionCreate,
     AboutSectionUpdate,
+    CommentBatch,
+    CommentBatchRequest,
     CommentCreate,
     CommentResponse,
     EmailCodeRequest,
     ImageUploadResponse,
+    ImageVariant,
     LoginRequest,
+    PaginatedComments,
+    PaginatedPostSummaries,
     PaginatedPosts,
+    PostBatch,
+    PostBatchRequest,
     PostCreate,
     PostResponse,
+    PostSearchResults,
+    PresignedUploadRequest,
+    PresignedUploadResponse,
     RegisterRequest,
     RoleUpdateRequest,
     TokenResponse,
@@ -45,8 +100,7 @@ app = FastAPI(
     version="0.1.0",
 )
 
-UPLOAD_DIR = Path(__file__).resolve().parent / "uploads"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+storage = get_storage()
 ALLOWED_IMAGE_TYPES: dict[str, str] = {
     "image/jpeg": ".jpg",
     "image/jpg": ".jpg",
@@ -58,7 +112,19 @@ ALLOWED_IMAGE_TYPES: dict[str, str] = {
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
 CHUNK_SIZE = 1024 * 1024
 
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+request_code_throttle = Throttle(
+    "request-code",
+    ip_rate=settings.rate_limit_request_code_ip,
+    subject_rate=settings.rate_limit_request_code_email,
+)
+login_throttle = Throttle(
+    "login",
+    ip_rate=settings.rate_limit_login_ip,
+    subject_rate=settings.rate_limit_login_identifier,
+)
+
+if isinstance(storage, LocalStorage):
+    app.mount("/uploads", ImmutableStaticFiles(directory=storage.directory), name="uploads")
 
 cors_origins = settings.cors_allow_origins or ["http://localhost:3000"]
 
@@ -69,6 +135,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event("startup")
@@ -76,47 +145,82 @@ def startup_event() -> None:
     run_initialization()
 
 
+@app.on_event("startup")
+async def start_background_workers() -> None:
+    outbox_worker.start()
+    maintenance_worker.start()
+    about_snapshot.start()
+    live_broker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    await outbox_worker.stop()
+    await maintenance_worker.stop()
+    await about_snapshot.stop()
+    await live_broker.stop()
+    shutdown_password_pool()
+    shutdown_image_pool()
+    await dispose_engines()
+
+
 @app.get("/health")
-def health() -> dict[str, str]:
+async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request) -> Response:
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.metrics_token:
+        supplied = request.headers.get("authorization", "")
+        if not secrets.compare_digest(supplied.encode(), f"Bearer {settings.metrics_token}".encode()):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 def _generate_code(length: int = 6) -> str:
     digits = string.digits
     return "".join(secrets.choice(digits) for _ in range(length))
 
 
-async def _save_upload(file: UploadFile, destination: Path) -> int:
-    size = 0
+async def _save_upload(file: UploadFile, extension: str, content_type: str) -> StoredObject:
+    async def chunks() -> AsyncIterator[bytes]:
+        size = 0
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_IMAGE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail="Image too large (max 5MB)",
+                )
+            yield chunk
+
     try:
-        with destination.open("wb") as buffer:
-            while True:
-                chunk = await file.read(CHUNK_SIZE)
-                if not chunk:
-                    break
-                size += len(chunk)
-                if size > MAX_IMAGE_SIZE:
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail="Image too large (max 5MB)",
-                    )
-                buffer.write(chunk)
+        return await storage.save_stream(chunks(), extension=extension, content_type=content_type)
     except HTTPException:
-        if destination.exists():
-            destination.unlink()
         raise
     except Exception as exc:  # pragma: no cover - unexpected IO failure
-        if destination.exists():
-            destination.unlink()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to upload image") from exc
     finally:
         await file.close()
-    return size
 
 
 @app.post("/auth/request-code", status_code=status.HTTP_202_ACCEPTED)
-def request_email_code(payload: EmailCodeRequest, db: Session = Depends(get_db)) -> dict[str, str]:
-    normalized_email = payload.email.strip().lower()
+async def request_email_code(
+    payload: EmailCodeRequest,
+    throttle: ThrottleGuard = Depends(request_code_throttle),
+    db: AsyncSession = Depends(get_db),
+) -> dict[str, str]:
+    normalized_email = normalize_email(payload.email)
+    await throttle.check_subject(normalized_email)
+    is_production = settings.environment.lower() == "production"
+    if is_production and not has_sender_configs():
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to send verification email")
     code = _generate_code()
     expires_at = now() + timedelta(minutes=15)
     entity = EmailVerificationCode(
@@ -125,48 +229,45 @@ def request_email_code(payload: EmailCodeRequest, db: Session = Depends(get_db))
         expires_at=expires_at,
     )
     db.add(entity)
-    db.commit()
-    email_sent = send_verification_email(
-        to_email=normalized_email,
-        code=code,
-        app_name=settings.app_name,
-    )
-    is_production = settings.environment.lower() == "production"
-    if not email_sent and is_production:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to send verification email")
+    subject, body = build_verification_email(code=code, app_name=settings.app_name)
+    enqueue_email(db, to_email=normalized_email, subject=subject, body=body, from_name=settings.app_name)
+    await db.commit()
+    outbox_worker.wake()
     return {"message": "Verification code generated"}
 
 
 @app.post("/auth/register", response_model=UserResponse)
-def register_user(payload: RegisterRequest, db: Session = Depends(get_db)) -> UserResponse:
-    normalized_email = payload.email.strip().lower()
+async def register_user(payload: RegisterRequest, db: AsyncSession = Depends(get_db)) -> UserResponse:
+    normalized_email = normalize_email(payload.email)
     current_time = now()
     code_entry = (
-        db.query(EmailVerificationCode)
-        .filter(
-            func.lower(EmailVerificationCode.email) == normalized_email,
-            EmailVerificationCode.code == payload.verification_code,
-            EmailVerificationCode.used.is_(False),
-            EmailVerificationCode.expires_at > current_time,
+        await db.scalars(
+            select(EmailVerificationCode)
+            .where(
+                EmailVerificationCode.email == normalized_email,
+                EmailVerificationCode.code == payload.verification_code,
+                EmailVerificationCode.used.is_(False),
+                EmailVerificationCode.expires_at > current_time,
+            )
+            .order_by(EmailVerificationCode.created_at.desc())
+            .limit(1)
         )
-        .order_by(EmailVerificationCode.created_at.desc())
-        .first()
-    )
+    ).first()
     if not code_entry:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired code")
 
-    existing_email = db.query(User).filter(func.lower(User.email) == normalized_email).first()
+    existing_email = (await db.scalars(select(User.id).where(User.email == normalized_email))).first()
     if existing_email:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="email already registered")
 
-    existing_username = db.query(User).filter(User.username == payload.username).first()
+    existing_username = (await db.scalars(select(User.id).where(User.username == payload.username))).first()
     if existing_username:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="username already registered")
 
     user = User(
         username=payload.username,
         email=normalized_email,
-        hashed_password=get_password_hash(payload.password),
+        hashed_password=await hash_password(payload.password),
         role=UserRole.USER,
         preferred_locale=payload.preferred_locale or settings.default_locale,
         preferred_theme=payload.preferred_theme or settings.default_theme,
@@ -174,59 +275,155 @@ def register_user(payload: RegisterRequest, db: Session = Depends(get_db)) -> Us
     )
     db.add(user)
     code_entry.used = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @app.post("/auth/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse:
+async def login(
+    payload: LoginRequest,
+    throttle: ThrottleGuard = Depends(login_throttle),
+    db: AsyncSession = Depends(get_db),
+) -> TokenResponse:
     identifier = payload.identifier.strip()
-    query = db.query(User).filter(
-        (func.lower(User.email) == func.lower(identifier)) | (User.username == identifier)
-    )
-    user = query.one_or_none()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    await throttle.check_subject(identifier.lower())
+    # Two single-column lookups instead of an OR, so each can use its unique index.
+    user = None
+    if "@" in identifier:
+        user = (await db.scalars(select(User).where(User.email == normalize_email(identifier)))).first()
+    if user is None:
+        user = (await db.scalars(select(User).where(User.username == identifier))).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    password_valid, upgraded_hash = await verify_and_update_password(payload.password, user.hashed_password)
+    if not password_valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User inactive")
+    if upgraded_hash:
+        user.hashed_password = upgraded_hash
+        await db.commit()
     token = create_access_token(subject=str(user.id), role=user.role)
     return TokenResponse(access_token=token)
 
 
 @app.get("/auth/me", response_model=UserResponse)
-def current_user_profile(current_user: User = Depends(get_current_user)) -> UserResponse:
+async def current_user_profile(current_user: User = Depends(get_current_user)) -> UserResponse:
     return current_user
 
 
-@app.get("/posts", response_model=PaginatedPosts)
-def list_posts(
+@app.get("/posts", response_model=PaginatedPostSummaries | PaginatedPosts)
+async def list_posts(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=20),
     author_id: UUID | None = Query(None),
-    db: Session = Depends(get_db),
-) -> PaginatedPosts:
-    query = db.query(Post)
+    cursor: str | None = Query(None, description="Keyset cursor; pass an empty value to start from the newest post"),
+    include_total: bool = Query(False, description="Include an approximate total in cursor mode"),
+    view: Literal["summary", "full"] = Query("summary", description="summary replaces each body with an excerpt"),
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
+    if view == "summary":
+        query, to_item, adapter = select_post_summaries(), post_summary_row, post_summaries_page_adapter
+    else:
+        query, to_item, adapter = select_posts(), post_row, posts_page_adapter
+    count_query = select(func.count(Post.id))
     if author_id is not None:
-        query = query.filter(Post.author_id == author_id)
-
-    total = query.with_entities(func.count(Post.id)).scalar() or 0
-    items = query.order_by(Post.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
-    has_more = page * page_size < total
-    return PaginatedPosts(
-        items=items,
-        page=page,
-        page_size=page_size,
-        total=total,
-        has_more=has_more,
+        query = query.where(Post.author_id == author_id)
+        count_query = count_query.where(Post.author_id == author_id)
+    query = query.order_by(Post.created_at.desc(), Post.id.desc())
+
+    if cursor is None:
+        page_number: int | None = page
+        total = (await db.execute(count_query)).scalar() or 0
+        items = [to_item(row) for row in await db.execute(query.offset((page - 1) * page_size).limit(page_size))]
+        has_more = page * page_size < total
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"]) if has_more and items else None
+    else:
+        page_number = None
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.where(tuple_(Post.created_at, Post.id) < tuple_(cursor_created_at, cursor_id))
+        rows = (await db.execute(query.limit(page_size + 1))).all()
+        items = [to_item(row) for row in rows[:page_size]]
+        has_more = len(rows) > page_size
+        total = await approximate_post_count(db, author_id) if include_total else None
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"]) if has_more else None
+
+    versions = [_post_version(post) for post in items]
+    etag = make_etag(view, page_number, page_size, total, has_more, next_cursor, versions)
+    not_modified = conditional_response(request, response, etag=etag, cache_control=CACHE_REVALIDATE)
+    if not_modified is not None:
+        return not_modified
+    return render(
+        adapter,
+        {
+            "items": items,
+            "page": page_number,
+            "page_size": page_size,
+            "total": total,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+        },
+        response,
+    )
+
+
+@app.get("/posts/search", response_model=PostSearchResults)
+async def search_posts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    page_size: int = Query(20, ge=1, le=20),
+    cursor: str | None = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
+    terms = query_terms(q)
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query cannot be empty")
+    tsquery = build_tsquery(terms)
+    # ts_rank returns float4, which does not survive a round trip through the cursor; compare as float8.
+    rank = cast(func.ts_rank(Post.search_vector, tsquery), DOUBLE_PRECISION)
+    query = (
+        select_posts(rank.label("rank"))
+        .where(Post.search_vector.bool_op("@@")(tsquery))
+        .order_by(rank.desc(), Post.created_at.desc(), Post.id.desc())
+    )
+    if cursor:
+        cursor_rank, cursor_created_at, cursor_id = decode_ranked_cursor(cursor)
+        query = query.where(
+            tuple_(rank, Post.created_at, Post.id)
+            < tuple_(literal(cursor_rank, DOUBLE_PRECISION), cursor_created_at, cursor_id)
+        )
+    rows = (await db.execute(query.limit(page_size + 1))).all()
+    page = rows[:page_size]
+    has_more = len(rows) > page_size
+    items = [
+        {
+            **post_row(row),
+            "rank": row.rank,
+            "title_highlight": highlight(row.title, terms),
+            "snippet": highlight(row.content, terms, length=SNIPPET_LENGTH),
+        }
+        for row in page
+    ]
+    next_cursor = None
+    if has_more:
+        last = page[-1]
+        next_cursor = encode_ranked_cursor(last.rank, last.created_at, last.id)
+    return render(
+        search_results_adapter,
+        {"items": items, "page_size": page_size, "has_more": has_more, "next_cursor": next_cursor},
+        response,
     )
 
 
 @app.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
-def create_post(
+async def create_post(
     payload: PostCreate,
     current_user: User = Depends(require_roles(UserRole.USER, UserRole.ADMIN)),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> PostResponse:
     post = Post(
         title=payload.title,
@@ -235,14 +432,16 @@ def create_post(
         author_id=current_user.id,
     )
     db.add(post)
-    db.commit()
-    db.refresh(post)
-    return post
+    await db.flush()
+    await publish_post_created(db, post, current_user)
+    await db.commit()
+    return await _load_post(db, post.id, refresh=True)
 
 
 @app.post("/api/uploads/images", response_model=ImageUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_image(
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     _: User = Depends(require_roles(UserRole.USER, UserRole.ADMIN)),
 ) -> ImageUploadResponse:
@@ -251,59 +450,254 @@ async def upload_image(
     if not extension:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported image type")
 
-    filename = f"{uuid4().hex}{extension}"
-    destination = UPLOAD_DIR / filename
-    file_size = await _save_upload(file, destination)
-    url = request.url_for("uploads", path=filename)
-    return ImageUploadResponse(url=str(url), filename=filename, size=file_size)
+    stored = await _save_upload(file, extension, content_type)
+    variants = [
+        ImageVariant(url=storage.public_url(name, request), width=width, format=fmt)
+        for width, fmt, name in planned_variants(stored.key)
+    ]
+    # Deduplicated uploads already got their variants the first time around.
+    if variants and stored.created:
+        background_tasks.add_task(generate_variants, storage, stored.key)
+    return ImageUploadResponse(
+        url=storage.public_url(stored.key, request),
+        filename=stored.key,
+        size=stored.size,
+        variants=variants,
+    )
+
+
+@app.post("/api/uploads/images/presign", response_model=PresignedUploadResponse)
+async def presign_image_upload(
+    payload: PresignedUploadRequest,
+    _: User = Depends(require_roles(UserRole.USER, UserRole.ADMIN)),
+) -> PresignedUploadResponse:
+    extension = ALLOWED_IMAGE_TYPES.get(payload.content_type)
+    if not extension:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported image type")
+    form = await storage.presign_upload(extension=extension, content_type=payload.content_type, max_size=MAX_IMAGE_SIZE)
+    if form is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Direct uploads are not supported by the configured storage backend",
+        )
+    return PresignedUploadResponse(**form)
+
+
+async def _load_post(db: AsyncSession, post_id: UUID, *, refresh: bool = False) -> Post | None:
+    return await db.get(
+        Post,
+        post_id,
+        options=[joinedload(Post.author, innerjoin=True)],
+        populate_existing=refresh,
+    )
+
+
+def _post_version(post: dict) -> tuple:
+    # Everything in PostResponse that can change without a new post id.
+    author = post["author"]
+    return (post["id"], post["updated_at"], post["comment_count"], author["username"], author["role"])
+
+
+@app.post("/posts/batch-get", response_model=PostBatch)
+async def batch_get_posts(
+    payload: PostBatchRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
+    post_ids = list(dict.fromkeys(payload.ids))
+    rows = (await db.execute(select_posts().where(Post.id.in_(post_ids)))).all()
+    found = {row.id: post_row(row) for row in rows}
+    return render(
+        post_batch_adapter,
+        {
+            "items": [found[post_id] for post_id in post_ids if post_id in found],
+            "missing": [post_id for post_id in post_ids if post_id not in found],
+        },
+        response,
+    )
+
+
+@app.post("/posts/comments/batch-get", response_model=CommentBatch)
+async def batch_get_comments(
+    payload: CommentBatchRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
+    post_ids = list(dict.fromkeys(payload.post_ids))
+    # Each post's first page, read through the (post_id, created_at, id) index;
+    # the outer join keeps posts without comments and tells them from missing ones.
+    first_page = (
+        select_comments()
+        .where(Comment.post_id == Post.id)
+        .order_by(Comment.created_at.asc(), Comment.id.asc())
+        .limit(payload.per_post + 1)
+        .lateral("first_page")
+    )
+    rows = (
+        await db.execute(
+            select(Post.id.label("requested_post_id"), first_page)
+            .select_from(Post)
+            .outerjoin(first_page, true())
+            .where(Post.id.in_(post_ids))
+            .order_by(Post.id, first_page.c.created_at.asc(), first_page.c.id.asc())
+        )
+    ).all()
+    comments: dict[UUID, list[Any]] = {}
+    for row in rows:
+        page = comments.setdefault(row.requested_post_id, [])
+        if row.id is not None:
+            page.append(row)
+
+    items = []
+    for post_id in post_ids:
+        if post_id not in comments:
+            continue
+        page = comments[post_id][: payload.per_post]
+        has_more = len(comments[post_id]) > payload.per_post
+        items.append(
+            {
+                "post_id": post_id,
+                "items": [comment_row(row) for row in page],
+                "has_more": has_more,
+                "next_cursor": encode_cursor(page[-1].created_at, page[-1].id) if has_more else None,
+            }
+        )
+    return render(
+        comment_batch_adapter,
+        {"items": items, "missing": [post_id for post_id in post_ids if post_id not in comments]},
+        response,
+    )
 
 
 @app.get("/posts/{post_id}", response_model=PostResponse)
-def get_post(post_id: UUID, db: Session = Depends(get_db)) -> PostResponse:
-    post = db.get(Post, post_id)
-    if not post:
+async def get_post(
+    post_id: UUID,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
+    row = (await db.execute(select_posts().where(Post.id == post_id))).first()
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    return post
+    post = post_row(row)
+    not_modified = conditional_response(request, response, etag=make_etag(_post_version(post)), cache_control=CACHE_POST)
+    if not_modified is not None:
+        return not_modified
+    return render(post_adapter, post, response)
 
 
-@app.get("/posts/{post_id}/comments", response_model=list[CommentResponse])
-def get_comments(post_id: UUID, db: Session = Depends(get_db)) -> list[CommentResponse]:
-    comments = (
-        db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at.asc()).all()
+@app.get("/posts/{post_id}/comments", response_model=PaginatedComments)
+async def get_comments(
+    post_id: UUID,
+    request: Request,
+    response: Response,
+    page_size: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="Keyset cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_read_db),
+) -> Response:
+    query = (
+        select_comments()
+        .where(Comment.post_id == post_id)
+        .order_by(Comment.created_at.asc(), Comment.id.asc())
+    )
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(Comment.created_at, Comment.id) > tuple_(cursor_created_at, cursor_id))
+    rows = (await db.execute(query.limit(page_size + 1))).all()
+    items = rows[:page_size]
+    has_more = len(rows) > page_size
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_more else None
+
+    # Comments are never edited, so the newest one on the page dates it.
+    versions = [(comment.id, comment.author_username, comment.author_role) for comment in items]
+    not_modified = conditional_response(
+        request,
+        response,
+        etag=make_etag(post_id, cursor, page_size, has_more, versions),
+        cache_control=CACHE_REVALIDATE,
+        last_modified=items[-1].created_at if items else None,
+    )
+    if not_modified is not None:
+        return not_modified
+    return render(
+        comments_page_adapter,
+        {
+            "items": [comment_row(row) for row in items],
+            "page_size": page_size,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+        },
+        response,
     )
-    return comments
 
 
 @app.post("/posts/{post_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
-def create_comment(
+async def create_comment(
     post_id: UUID,
     payload: CommentCreate,
     current_user: User = Depends(require_roles(UserRole.USER, UserRole.ADMIN)),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> CommentResponse:
-    post = db.get(Post, post_id)
-    if not post:
+    # Doubles as the existence check. updated_at is kept so a comment does not
+    # look like an edit of the post.
+    counted = await db.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(comment_count=Post.comment_count + 1, updated_at=Post.updated_at)
+        .returning(Post.id)
+    )
+    if counted.first() is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
     comment = Comment(content=payload.content, author_id=current_user.id, post_id=post_id)
     db.add(comment)
-    db.commit()
-    db.refresh(comment)
-    return comment
+    await db.flush()
+    await publish_comment_created(db, comment, current_user)
+    await db.commit()
+    return await db.get(
+        Comment,
+        comment.id,
+        options=[joinedload(Comment.author, innerjoin=True)],
+        populate_existing=True,
+    )
+
+
+@app.get("/live", response_class=StreamingResponse)
+async def live_events(
+    post_id: UUID | None = Query(None, description="Stream this post's new comments instead of new posts"),
+) -> StreamingResponse:
+    live_broker.check_capacity()
+    return StreamingResponse(
+        live_broker.stream(post_id),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding events back.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/about/sections", response_model=list[AboutSectionResponse])
-def get_about_sections(db: Session = Depends(get_db)) -> list[AboutSectionResponse]:
-    return db.query(AboutSection).order_by(AboutSection.id.asc()).all()
+async def get_about_sections(request: Request) -> Response:
+    snapshot = await about_snapshot.get()
+    response = JSONBytesResponse(snapshot.body)
+    not_modified = conditional_response(
+        request,
+        response,
+        etag=snapshot.etag,
+        cache_control=CACHE_ABOUT,
+        last_modified=snapshot.last_modified,
+    )
+    if not_modified is not None:
+        return not_modified
+    return response
 
 
 @app.put("/about/sections/{slug}", response_model=AboutSectionResponse)
-def update_about_section(
+async def update_about_section(
     slug: str,
     payload: AboutSectionUpdate,
     current_user: User = Depends(require_roles(UserRole.ADMIN)),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> AboutSectionResponse:
-    section = db.query(AboutSection).filter(AboutSection.slug == slug).one_or_none()
+    section = (await db.execute(select(AboutSection).where(AboutSection.slug == slug))).scalar_one_or_none()
     if not section:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
     if payload.title:
@@ -311,8 +705,10 @@ def update_about_section(
     section.body_markdown = payload.body_markdown
     section.updated_by = current_user.id
     section.updated_at = now()
-    db.commit()
-    db.refresh(section)
+    await bump_version(db, ABOUT_SECTIONS)
+    await db.commit()
+    await about_snapshot.reload()
+    await db.refresh(section)
     return section
 
 
@@ -332,21 +728,21 @@ def _normalize_about_slug(raw: str) -> str:
 
 
 @app.post("/about/sections", response_model=AboutSectionResponse, status_code=status.HTTP_201_CREATED)
-def create_about_section(
+async def create_about_section(
     payload: AboutSectionCreate,
     current_user: User = Depends(require_roles(UserRole.SUPERADMIN)),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> AboutSectionResponse:
     if payload.slug:
         slug = _normalize_about_slug(payload.slug)
-        exists = db.query(AboutSection).filter(AboutSection.slug == slug).one_or_none()
+        exists = (await db.execute(select(AboutSection.id).where(AboutSection.slug == slug))).first()
         if exists:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Slug already exists")
     else:
         slug = ""
         for _ in range(10):
             candidate = f"section_{uuid4().hex[:10]}"
-            exists = db.query(AboutSection).filter(AboutSection.slug == candidate).one_or_none()
+            exists = (await db.execute(select(AboutSection.id).where(AboutSection.slug == candidate))).first()
             if not exists:
                 slug = candidate
                 break
@@ -361,43 +757,72 @@ def create_about_section(
         updated_at=now(),
     )
     db.add(section)
-    db.commit()
-    db.refresh(section)
+    await bump_version(db, ABOUT_SECTIONS)
+    await db.commit()
+    await about_snapshot.reload()
+    await db.refresh(section)
     return section
 
 
 @app.delete("/about/sections/{slug}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_about_section(
+async def delete_about_section(
     slug: str,
     _: User = Depends(require_roles(UserRole.SUPERADMIN)),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Response:
-    section = db.query(AboutSection).filter(AboutSection.slug == slug).one_or_none()
+    section = (await db.execute(select(AboutSection).where(AboutSection.slug == slug))).scalar_one_or_none()
     if not section:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
-    db.delete(section)
-    db.commit()
+    await db.delete(section)
+    await bump_version(db, ABOUT_SECTIONS)
+    await db.commit()
+    await about_snapshot.reload()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @app.patch("/admin/users/{user_id}/role", response_model=UserResponse)
-def update_user_role(
+async def update_user_role(
     user_id: UUID,
     payload: RoleUpdateRequest,
     current_user: User = Depends(require_roles(UserRole.SUPERADMIN)),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> UserResponse:
-    user = db.get(User, user_id)
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if user.role == UserRole.SUPERADMIN and payload.role != UserRole.SUPERADMIN:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot demote super admin")
     user.role = payload.role
-    db.commit()
-    db.refresh(user)
+    await publish_user_changed(db, user.id)
+    await db.commit()
+    invalidate_cached_user(user.id)
+    await db.refresh(user)
     return user
 
 
+@app.get("/admin/cache-stats")
+async def cache_stats(_: User = Depends(require_roles(UserRole.SUPERADMIN))) -> dict[str, dict[str, int]]:
+    return {"users": user_cache.stats()}
+
+
+@app.get("/admin/profiles")
+async def request_profiles(_: User = Depends(require_roles(UserRole.ADMIN))) -> dict[str, list[dict[str, Any]]]:
+    return {"profiles": list_profiles()}
+
+
+@app.get("/admin/profiles/{name}", response_class=FileResponse)
+async def download_request_profile(name: str, _: User = Depends(require_roles(UserRole.ADMIN))) -> FileResponse:
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
+
+
+@app.get("/admin/email-senders")
+async def email_sender_stats(_: User = Depends(require_roles(UserRole.SUPERADMIN))) -> dict[str, list[dict[str, Any]]]:
+    return {"senders": sender_stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,6 +1,6 @@
 "use client"
 
-import { useCallback, useEffect, useMemo, useState } from "react"
+import { useCallback, useEffect, useMemo, useRef, useState } from "react"
 import { useParams, useRouter } from "next/navigation"
 import { Card, CardContent, CardFooter, CardHeader } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
@@ -11,8 +11,8 @@ import { useAuth } from "@/components/providers/auth-provider"
 import { MessageSquare, ArrowLeft, ChevronDown } from "lucide-react"
 import Image from "next/image"
 import { ImageLightbox } from "@/components/image-lightbox"
-import { apiFetch } from "@/lib/api"
-import type { Comment, Post } from "@/lib/types"
+import { apiFetch, subscribeLive } from "@/lib/api"
+import type { Comment, PaginatedComments, Post } from "@/lib/types"
 
 export default function PostDetailPage() {
   const params = useParams()
@@ -26,6 +26,7 @@ export default function PostDetailPage() {
 
   const [post, setPost] = useState<Post | null>(null)
   const [comments, setComments] = useState<Comment[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [commentText, setCommentText] = useState("")
   const [commentsToShow, setCommentsToShow] = useState(5)
   const [loadingPost, setLoadingPost] = useState(true)
@@ -33,6 +34,14 @@ export default function PostDetailPage() {
   const [error, setError] = useState<string | null>(null)
   const [lightboxSrc, setLightboxSrc] = useState<string | null>(null)
   const [lightboxAlt, setLightboxAlt] = useState("Post image")
+  // Our own comments arrive both from the POST response and the live stream.
+  const countedComments = useRef(new Set<string>())
+
+  const countComment = useCallback((commentId: string) => {
+    if (countedComments.current.has(commentId)) return
+    countedComments.current.add(commentId)
+    setPost((prev) => (prev ? { ...prev, comment_count: (prev.comment_count ?? 0) + 1 } : prev))
+  }, [])
 
   const fetchPost = useCallback(async () => {
     if (!postId) return
@@ -52,8 +61,9 @@ export default function PostDetailPage() {
     if (!postId) return
     setLoadingComments(true)
     try {
-      const data = await apiFetch<Comment[]>(`/posts/${postId}/comments`)
-      setComments(data)
+      const data = await apiFetch<PaginatedComments>(`/posts/${postId}/comments`)
+      setComments(data.items)
+      setNextCursor(data.next_cursor ?? null)
     } catch (err: any) {
       setError((prev) => prev || err?.message || "无法加载评论")
     } finally {
@@ -67,8 +77,38 @@ export default function PostDetailPage() {
     setCommentsToShow(5)
   }, [fetchPost, fetchComments])
 
-  const loadMoreComments = () => {
-    setCommentsToShow((prev) => prev + 5)
+  useEffect(() => {
+    if (!postId) return
+    return subscribeLive(`/live?post_id=${postId}`, {
+      comment_created: (comment: Comment) => {
+        countComment(comment.id)
+        if (!comment.content) {
+          fetchComments()
+          return
+        }
+        setComments((prev) => (prev.some((item) => item.id === comment.id) ? prev : [...prev, comment]))
+      },
+      resync: () => {
+        fetchPost()
+        fetchComments()
+      },
+    })
+  }, [postId, fetchPost, fetchComments, countComment])
+
+  const loadMoreComments = async () => {
+    const nextCount = commentsToShow + 5
+    if (nextCount > comments.length && nextCursor) {
+      try {
+        const data = await apiFetch<PaginatedComments>(
+          `/posts/${postId}/comments?cursor=${encodeURIComponent(nextCursor)}`,
+        )
+        setComments((prev) => [...prev, ...data.items])
+        setNextCursor(data.next_cursor ?? null)
+      } catch (err: any) {
+        setError((prev) => prev || err?.message || "无法加载评论")
+      }
+    }
+    setCommentsToShow(nextCount)
   }
 
   const formatDate = (dateString: string) => {
@@ -90,12 +130,13 @@ export default function PostDetailPage() {
       return
     }
     try {
-      await apiFetch<Comment>(`/posts/${postId}/comments`, {
+      const created = await apiFetch<Comment>(`/posts/${postId}/comments`, {
         method: "POST",
         token,
         body: JSON.stringify({ content: commentText.trim() }),
       })
       setCommentText("")
+      countComment(created.id)
       await fetchComments()
     } catch (err: any) {
       alert(err?.message || "评论失败，请稍后再试")
@@ -167,7 +208,7 @@ export default function PostDetailPage() {
               <Button variant="ghost" size="lg" className="gap-2 text-lg" disabled>
                 <MessageSquare className="h-5 w-5" />
                 <span>
-                  {comments.length} {t("comments")}
+                  {post.comment_count ?? comments.length} {t("comments")}
                 </span>
               </Button>
             </CardFooter>
@@ -183,7 +224,7 @@ export default function PostDetailPage() {
         <Card>
           <CardHeader className="p-8">
             <h2 className="text-2xl font-semibold">
-              {t("comments")} ({comments.length})
+              {t("comments")} ({post?.comment_count ?? comments.length})
             </h2>
           </CardHeader>
           <CardContent className="space-y-5 p-8 pt-0">
@@ -218,7 +259,7 @@ export default function PostDetailPage() {
                   <div className="flex-1 space-y-1">
                     <div className="flex items-center gap-2">
                       <span className="text-lg font-medium">
-                        {comment.author_id ? comment.author_id.slice(0, 8) : "ituhouse"}
+                        {comment.author?.username || (comment.author_id ? comment.author_id.slice(0, 8) : "ituhouse")}
                       </span>
                       <span className="text-base text-muted-foreground">{formatDate(comment.created_at)}</span>
                     </div>
@@ -227,7 +268,7 @@ export default function PostDetailPage() {
                 </div>
               ))}
 
-              {displayedComments.length < comments.length && (
+              {(displayedComments.length < comments.length || nextCursor) && (
                 <div className="flex justify-center pt-5">
                   <Button onClick={loadMoreComments} variant="outline" size="lg" className="gap-2 bg-transparent px-6 text-lg">
                     <ChevronDown className="h-6 w-6" />
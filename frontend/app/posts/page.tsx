@@ -12,20 +12,22 @@ import { MessageSquare, ChevronDown, X, Plus, ArrowUp } from "lucide-react"
 import Image from "next/image"
 import { CreatePostDialog } from "@/components/create-post-dialog"
 import { ImageLightbox } from "@/components/image-lightbox"
-import { apiFetch, normalizePaginatedPosts } from "@/lib/api"
+import { apiFetch, normalizePaginatedPosts, subscribeLive } from "@/lib/api"
 import { getAvatarSrc } from "@/lib/avatar"
 import { getAppScrollContainer } from "@/lib/scroll-container"
-import type { Comment, PaginatedPosts, Post } from "@/lib/types"
+import type { Comment, PaginatedComments, PaginatedPosts, Post, PostSummary } from "@/lib/types"
+import { postPreview } from "@/lib/utils"
 
 export default function PostsPage() {
   const { t, language } = useLanguage()
   const { user, token } = useAuth()
-  const [posts, setPosts] = useState<Post[]>([])
+  const [posts, setPosts] = useState<Array<Post | PostSummary>>([])
   const [page, setPage] = useState(1)
   const [hasMore, setHasMore] = useState(true)
   const [loading, setLoading] = useState(false)
-  const [selectedPost, setSelectedPost] = useState<Post | null>(null)
+  const [selectedPost, setSelectedPost] = useState<Post | PostSummary | null>(null)
   const [allComments, setAllComments] = useState<Comment[]>([])
+  const [commentsCursor, setCommentsCursor] = useState<string | null>(null)
   const [displayedComments, setDisplayedComments] = useState<Comment[]>([])
   const [commentText, setCommentText] = useState("")
   const [commentsToShow, setCommentsToShow] = useState(5)
@@ -40,9 +42,9 @@ export default function PostsPage() {
   const postItemRefs = useRef<Record<string, HTMLDivElement | null>>({})
   const floatingActionButtonClass =
     "h-14 w-14 rounded-full border border-border/60 bg-background/90 shadow-lg backdrop-blur transition-all hover:-translate-y-0.5 hover:shadow-xl"
-  const dedupePosts = useCallback((list: Post[]) => {
+  const dedupePosts = useCallback((list: Array<Post | PostSummary>) => {
     const seen = new Set<string>()
-    const result: Post[] = []
+    const result: Array<Post | PostSummary> = []
     for (const item of list) {
       if (seen.has(item.id)) continue
       seen.add(item.id)
@@ -61,6 +63,28 @@ export default function PostsPage() {
     [dedupePosts],
   )
 
+  useEffect(() => {
+    return subscribeLive("/live", {
+      post_created: async (post: PostSummary) => {
+        try {
+          const item = "excerpt" in post ? post : await apiFetch<Post>(`/posts/${post.id}`)
+          setPosts((prev) => dedupePosts([item, ...prev]))
+        } catch {
+          // the next resync or reload picks it up
+        }
+      },
+      resync: async () => {
+        try {
+          const response = await apiFetch<PaginatedPosts>(`/posts?page=1&page_size=20`)
+          const data = normalizePaginatedPosts(response)
+          setPosts((prev) => dedupePosts([...data.items, ...prev]))
+        } catch {
+          // keep what we have
+        }
+      },
+    })
+  }, [dedupePosts])
+
   const loadPosts = useCallback(async () => {
     if (loading || !hasMore) return
     setLoading(true)
@@ -124,16 +148,18 @@ export default function PostsPage() {
     getAppScrollContainer()?.scrollTo({ top: 0, behavior: "smooth" })
   }
 
-  const handleSelectPost = async (post: Post) => {
+  const handleSelectPost = async (post: Post | PostSummary) => {
     setSelectedPost(post)
     setCommentText("")
     setCommentsToShow(5)
     setAllComments([])
     setDisplayedComments([])
+    setCommentsCursor(null)
     try {
-      const comments = await apiFetch<Comment[]>(`/posts/${post.id}/comments`)
-      setAllComments(comments)
-      setDisplayedComments(comments.slice(0, 5))
+      const data = await apiFetch<PaginatedComments>(`/posts/${post.id}/comments`)
+      setAllComments(data.items)
+      setDisplayedComments(data.items.slice(0, 5))
+      setCommentsCursor(data.next_cursor ?? null)
     } catch (error: any) {
       alert(error?.message || "无法加载评论")
     }
@@ -146,9 +172,22 @@ export default function PostsPage() {
     setCommentText("")
   }
 
-  const loadMoreComments = () => {
+  const loadMoreComments = async () => {
     const nextCount = commentsToShow + 5
-    setDisplayedComments(allComments.slice(0, nextCount))
+    let comments = allComments
+    if (nextCount > comments.length && commentsCursor && selectedPost) {
+      try {
+        const data = await apiFetch<PaginatedComments>(
+          `/posts/${selectedPost.id}/comments?cursor=${encodeURIComponent(commentsCursor)}`,
+        )
+        comments = [...comments, ...data.items]
+        setAllComments(comments)
+        setCommentsCursor(data.next_cursor ?? null)
+      } catch (error: any) {
+        alert(error?.message || "无法加载评论")
+      }
+    }
+    setDisplayedComments(comments.slice(0, nextCount))
     setCommentsToShow(nextCount)
   }
 
@@ -165,9 +204,11 @@ export default function PostsPage() {
         body: JSON.stringify({ content: commentText.trim() }),
       })
       setCommentText("")
-      const updatedComments = await apiFetch<Comment[]>(`/posts/${selectedPost.id}/comments`)
-      setAllComments(updatedComments)
-      setDisplayedComments(updatedComments.slice(0, commentsToShow))
+      const data = await apiFetch<PaginatedComments>(`/posts/${selectedPost.id}/comments`)
+      setAllComments(data.items)
+      setDisplayedComments(data.items.slice(0, commentsToShow))
+      setCommentsCursor(data.next_cursor ?? null)
+      setSelectedPost((prev) => (prev ? { ...prev, comment_count: (prev.comment_count ?? 0) + 1 } : prev))
     } catch (error: any) {
       alert(error?.message || "评论失败，请稍后再试")
     }
@@ -232,7 +273,7 @@ export default function PostsPage() {
                   </div>
                 </CardHeader>
                 <CardContent className="space-y-4 px-5 pb-5 md:px-6">
-                  <p className="text-base text-muted-foreground leading-relaxed line-clamp-3">{post.content}</p>
+                  <p className="text-base text-muted-foreground leading-relaxed line-clamp-3">{postPreview(post)}</p>
                   {post.image_url && (
                     <button
                       type="button"
@@ -291,7 +332,7 @@ export default function PostsPage() {
                 <CardHeader className="border-b flex-shrink-0 p-5">
                   <div className="flex items-center justify-between">
                     <h2 className="text-lg font-semibold">
-                      {t("comments")} ({allComments.length})
+                      {t("comments")} ({selectedPost.comment_count ?? allComments.length})
                     </h2>
                     <Button variant="ghost" size="icon" onClick={handleCloseComments} className="h-10 w-10">
                       <X className="h-5 w-5" />
@@ -331,7 +372,7 @@ export default function PostsPage() {
                         <div className="flex-1 space-y-0.5 min-w-0">
                           <div className="flex items-center gap-2">
                             <span className="text-base font-medium">
-                              {comment.author_id ? comment.author_id.slice(0, 8) : "ituhouse"}
+                              {comment.author?.username || (comment.author_id ? comment.author_id.slice(0, 8) : "ituhouse")}
                             </span>
                             <span className="text-sm md:text-base text-muted-foreground">{formatDate(comment.created_at)}</span>
                           </div>
@@ -340,7 +381,7 @@ export default function PostsPage() {
                       </div>
                     ))}
 
-                    {displayedComments.length < allComments.length && (
+                    {(displayedComments.length < allComments.length || commentsCursor) && (
                       <div className="flex justify-center pt-4">
                         <Button
                           onClick={loadMoreComments}
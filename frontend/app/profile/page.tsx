@@ -8,13 +8,14 @@ import { useLanguage } from "@/components/providers/language-provider"
 import { useAuth } from "@/components/providers/auth-provider"
 import { apiFetch, normalizePaginatedPosts } from "@/lib/api"
 import { getAvatarSrc } from "@/lib/avatar"
-import type { PaginatedPosts, Post } from "@/lib/types"
+import type { PaginatedPosts, PostSummary } from "@/lib/types"
+import { postPreview } from "@/lib/utils"
 
 export default function ProfilePage() {
   const router = useRouter()
   const { t } = useLanguage()
   const { user, loading } = useAuth()
-  const [myPosts, setMyPosts] = useState<Post[]>([])
+  const [myPosts, setMyPosts] = useState<PostSummary[]>([])
   const [postsLoading, setPostsLoading] = useState(false)
   const [postsLoadingMore, setPostsLoadingMore] = useState(false)
   const [postsPage, setPostsPage] = useState(1)
@@ -147,7 +148,7 @@ export default function ProfilePage() {
                   {myPosts.map((post) => (
                     <li key={post.id} className="rounded-lg border p-5">
                       <p className="text-lg font-medium">{post.title || `${t("posts")} #${post.id.slice(0, 6)}`}</p>
-                      <p className="text-base md:text-lg text-muted-foreground line-clamp-2 mt-2">{post.content}</p>
+                      <p className="text-base md:text-lg text-muted-foreground line-clamp-2 mt-2">{postPreview(post)}</p>
                       <p className="text-sm md:text-base text-muted-foreground mt-3">
                         {new Date(post.created_at).toLocaleString("zh-CN")}
                       </p>
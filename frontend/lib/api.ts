@@ -34,6 +34,18 @@ export async function apiFetch<TResponse>(path: string, options: ApiFetchOptions
   return data as TResponse
 }
 
+type LiveHandlers = Record<string, (data: any) => void>
+
+// Server-Sent Events from GET /live. EventSource reconnects on its own; the
+// server sends "resync" when this client may have missed events.
+export function subscribeLive(path: string, handlers: LiveHandlers) {
+  const source = new EventSource(`${API_BASE_URL}${path}`)
+  for (const [event, handler] of Object.entries(handlers)) {
+    source.addEventListener(event, (message) => handler(safeParseJSON((message as MessageEvent).data)))
+  }
+  return () => source.close()
+}
+
 function safeParseJSON(payload: string) {
   try {
     return JSON.parse(payload)
@@ -17,12 +17,20 @@ export type User = {
   created_at: string
 }
 
+export type AuthorSummary = {
+  id: string
+  username: string
+  role: UserRole
+}
+
 export type Post = {
   id: string
   title: string
   content: string
   image_url?: string | null
   author_id: string
+  author?: AuthorSummary
+  comment_count?: number
   created_at: string
   updated_at: string
 }
@@ -31,16 +39,31 @@ export type Comment = {
   id: string
   post_id: string
   author_id: string
+  author?: AuthorSummary
   content: string
   created_at: string
 }
 
+// Feed item from GET /posts: the body is replaced by a server-side excerpt.
+export type PostSummary = Omit<Post, "content"> & {
+  excerpt: string
+  truncated: boolean
+}
+
+export type PaginatedComments = {
+  items: Comment[]
+  page_size: number
+  has_more: boolean
+  next_cursor?: string | null
+}
+
 export type PaginatedPosts = {
-  items: Post[]
+  items: PostSummary[]
   page: number
   page_size: number
   total: number
   has_more: boolean
+  next_cursor?: string | null
 }
 
 export type AboutSection = {
@@ -1,6 +1,14 @@
 import { clsx, type ClassValue } from 'clsx'
 import { twMerge } from 'tailwind-merge'
+import type { Post, PostSummary } from './types'
 
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+export function postPreview(post: Post | PostSummary) {
+  if ('excerpt' in post) {
+    return post.truncated ? `${post.excerpt}…` : post.excerpt
+  }
+  return post.content
+}